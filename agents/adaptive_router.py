@@ -3,19 +3,264 @@ Adaptive routing with confidence scoring - NOVEL FEATURE
 Routes queries to specialized agent paths based on complexity analysis
 """
 
+import argparse
+import asyncio
+import json
+import math
+import re
+import zlib
+from datetime import datetime
+from pathlib import Path
+import numpy as np
 from langchain_ollama import OllamaLLM
-from typing import Dict, Literal
+from typing import Dict, List, Literal, Tuple
+from agents.routing_cache import RoutingCache, get_routing_cache
+from tools.metrics_store import MetricsStore
+
+SCORE_KEYS = ('complexity', 'code', 'literature', 'novelty')
+
+# Hand-picked cues per score; hashed word and bigram features cover the rest
+KEYWORD_GROUPS = {
+    'code': ('implement', 'implementation', 'code', 'python', 'pytorch', 'tensorflow', 'library',
+             'api', 'algorithm', 'program', 'script', 'build', 'tutorial', 'example'),
+    'literature': ('survey', 'review', 'overview', 'literature', 'state', 'art', 'comparison',
+                   'compare', 'papers', 'research', 'advances', 'history'),
+    'novelty': ('novel', 'emerging', 'latest', 'recent', 'new', 'future', 'frontier', 'trends',
+                '2024', '2025', 'cutting', 'edge'),
+    'complexity': ('quantum', 'theory', 'theoretical', 'optimization', 'bayesian', 'stochastic',
+                   'differential', 'variational', 'convergence', 'reinforcement', 'adversarial',
+                   'multi', 'distributed', 'federated', 'causal')
+}
+
+# _determine_path compares integer scores with ">", so these are the real decision boundaries
+PATH_THRESHOLDS = {'complexity': 7.5, 'literature': 7.5, 'code': 7.5, 'novelty': 8.5}
+
+
+def _tokens(query: str) -> List[str]:
+    return re.findall(r'[a-z0-9]+', query.lower())
+
+
+class PreRouter:
+    """Keyword/hashed-feature ridge model that predicts router scores without the LLM
+    
+    Trained on logged LLM routing decisions. A prediction is trusted only when
+    every score sits far enough from its path threshold, given the model's
+    residual error, and most of the query's words were seen in training.
+    """
+    
+    def __init__(self, path: str = "data/pre_router.json", hash_dim: int = 512,
+                 min_confidence: float = 0.9, min_coverage: float = 0.6):
+        self.path = Path(path)
+        self.hash_dim = hash_dim
+        self.min_confidence = min_confidence
+        self.min_coverage = min_coverage
+        self.weights = None  # (features, 4)
+        self.sigma = None    # per-score residual std
+        self.seen = None     # hashed word buckets present in the training data
+        self.trained_on = 0
+        self.load()
+    
+    @property
+    def ready(self) -> bool:
+        return self.weights is not None
+    
+    def _bucket(self, token: str) -> int:
+        # crc32 is stable across processes, unlike hash()
+        return zlib.crc32(token.encode()) % self.hash_dim
+    
+    def features(self, query: str) -> np.ndarray:
+        """Hashed unigrams and bigrams, keyword-group counts, length and a bias term"""
+        words = _tokens(query)
+        hashed = np.zeros(self.hash_dim, dtype=np.float32)
+        for token in words + [f"{a}_{b}" for a, b in zip(words, words[1:])]:
+            hashed[self._bucket(token)] += 1.0
+        
+        word_set = set(words)
+        groups = [len(word_set.intersection(KEYWORD_GROUPS[key])) for key in SCORE_KEYS]
+        extra = np.array(groups + [math.log1p(len(words)), 1.0], dtype=np.float32)
+        return np.concatenate([hashed, extra])
+    
+    def fit(self, queries: List[str], scores: List[Dict[str, int]], l2: float = 1.0) -> Dict:
+        """Closed-form ridge regression; returns training error per score"""
+        X = np.stack([self.features(q) for q in queries]).astype(np.float64)
+        Y = np.array([[s[k] for k in SCORE_KEYS] for s in scores], dtype=np.float64)
+        
+        gram = X.T @ X + l2 * np.eye(X.shape[1])
+        self.weights = np.linalg.solve(gram, X.T @ Y)
+        
+        # Leave-one-out residuals via the hat-matrix diagonal: an honest error estimate
+        # for small training sets, where in-sample residuals would be near zero
+        hat = np.einsum('ij,ji->i', X, np.linalg.solve(gram, X.T))
+        residuals = (Y - X @ self.weights) / np.maximum(1 - hat, 1e-6)[:, None]
+        self.sigma = np.maximum(np.sqrt((residuals ** 2).mean(axis=0)), 0.25)
+        
+        self.seen = np.zeros(self.hash_dim, dtype=bool)
+        for q in queries:
+            for token in _tokens(q):
+                self.seen[self._bucket(token)] = True
+        
+        self.trained_on = len(queries)
+        return {k: round(float(e), 3) for k, e in zip(SCORE_KEYS, self.sigma)}
+    
+    def predict(self, query: str) -> Tuple[Dict[str, int], float]:
+        """Predicted scores and the confidence that they yield the LLM's path"""
+        raw = self.features(query) @ self.weights
+        scores = {k: int(min(max(round(float(v)), 0), 10)) for k, v in zip(SCORE_KEYS, raw)}
+        
+        words = _tokens(query)
+        coverage = sum(self.seen[self._bucket(w)] for w in words) / len(words) if words else 0.0
+        if coverage < self.min_coverage:
+            return scores, 0.0
+        
+        # Probability each score lands on the predicted side of its threshold
+        confidence = 1.0
+        for i, key in enumerate(SCORE_KEYS):
+            margin = abs(float(raw[i]) - PATH_THRESHOLDS[key]) / self.sigma[i]
+            confidence = min(confidence, 0.5 * (1 + math.erf(margin / math.sqrt(2))))
+        return scores, round(confidence, 3)
+    
+    def save(self):
+        data = {
+            'hash_dim': self.hash_dim,
+            'weights': self.weights.tolist(),
+            'sigma': self.sigma.tolist(),
+            'seen': np.flatnonzero(self.seen).tolist(),
+            'trained_on': self.trained_on,
+            'trained_at': datetime.now().isoformat()
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        tmp.replace(self.path)
+    
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.hash_dim = data['hash_dim']
+            self.weights = np.array(data['weights'])
+            self.sigma = np.array(data['sigma'])
+            self.seen = np.zeros(self.hash_dim, dtype=bool)
+            self.seen[data['seen']] = True
+            self.trained_on = data['trained_on']
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Pre-router model unreadable, using the LLM only: {e}")
+            self.weights = None
+            return False
+
+
+def load_routing_examples(log_path: str = "data/routing_log.jsonl",
+                          cache_path: str = "data/routing_cache/entries.json") -> Tuple[List[str], List[Dict]]:
+    """Logged LLM routing decisions, newest decision per query"""
+    examples = {}
+    cache_file = Path(cache_path)
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'r') as f:
+                for entry in json.load(f):
+                    examples[entry['query']] = entry['decision']['scores']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping routing cache entries: {e}")
+    
+    for record in MetricsStore(path=log_path, legacy_path=None, compact_every=0).iter_history():
+        if record.get('source', 'llm') == 'llm' and 'scores' in record:
+            examples[record['query']] = record['scores']
+    
+    queries = list(examples)
+    return queries, [examples[q] for q in queries]
+
 
 class AdaptiveRouter:
     """Routes queries intelligently based on complexity and domain analysis"""
     
-    def __init__(self, llm: OllamaLLM):
+    def __init__(self, llm: OllamaLLM, cache: RoutingCache = None, use_cache: bool = True,
+                 pre_router: PreRouter = None, use_pre_router: bool = True,
+                 log: MetricsStore = None):
         self.llm = llm
+        self.use_cache = use_cache
+        self._cache = cache
+        self.pre_router = pre_router or (get_pre_router() if use_pre_router else None)
+        # LLM decisions are logged as training data for the pre-router
+        self.log = log or MetricsStore(path="data/routing_log.jsonl", legacy_path=None, compact_every=0)
+    
+    @property
+    def cache(self) -> RoutingCache:
+        """Routing cache, shared process-wide unless one was passed in"""
+        if self.use_cache and self._cache is None:
+            self._cache = get_routing_cache()
+        return self._cache
     
     def analyze_query(self, query: str) -> Dict:
         """Analyze query complexity, domain, and required expertise"""
+        local, vector = self._local_decision(query)
+        if local:
+            return local
+        return self._record(query, self._analyze_with_llm(query), vector)
+    
+    async def aanalyze_query(self, query: str) -> Dict:
+        """analyze_query() for the event loop: lookups and logging run in worker threads,
+        the LLM call runs in the caller's task so cancelling the caller cancels it too"""
+        local, vector = await asyncio.to_thread(self._local_decision, query)
+        if local:
+            return local
+        response = await self.llm.ainvoke(self._routing_prompt(query))
+        return await asyncio.to_thread(self._record, query, self._decision(response), vector)
+    
+    def _local_decision(self, query: str) -> tuple:
+        """(decision, None) from the pre-router or cache, else (None, query vector for caching)"""
+        # Easy queries are routed locally in microseconds
+        if self.pre_router and self.pre_router.ready:
+            scores, confidence = self.pre_router.predict(query)
+            if confidence >= self.pre_router.min_confidence:
+                return {
+                    'scores': scores,
+                    'path': self._determine_path(scores),
+                    'confidence': self._calculate_confidence(scores),
+                    'cached': False,
+                    'source': 'pre_router',
+                    'pre_router_confidence': confidence
+                }, None
         
-        prompt = f"""Analyze this research query and provide scores (0-10):
+        # Semantically near-identical queries reuse an earlier decision
+        vector = None
+        if self.use_cache:
+            try:
+                cached, vector, similarity = self.cache.lookup(query)
+                if cached:
+                    cached['cached'] = True
+                    cached['source'] = 'cache'
+                    cached['similarity'] = round(similarity, 3)
+                    return cached, None
+            except Exception as e:
+                print(f"Routing cache unavailable: {e}")
+        return None, vector
+    
+    def _record(self, query: str, decision: Dict, vector) -> Dict:
+        """Log an LLM decision as pre-router training data and cache it by query vector"""
+        try:
+            self.log.append({'query': query, 'source': 'llm', **decision,
+                             'timestamp': datetime.now().isoformat()})
+        except OSError as e:
+            print(f"Routing log write failed: {e}")
+        
+        if vector is not None:
+            try:
+                self.cache.put(query, decision, vector)
+            except Exception as e:
+                print(f"Routing cache write failed: {e}")
+        
+        return {**decision, 'cached': False, 'source': 'llm'}
+    
+    def _analyze_with_llm(self, query: str) -> Dict:
+        """Score the query with one LLM call"""
+        return self._decision(self.llm.invoke(self._routing_prompt(query)))
+    
+    def _routing_prompt(self, query: str) -> str:
+        return f"""Analyze this research query and provide scores (0-10):
 
 Query: "{query}"
 
@@ -28,9 +273,9 @@ Provide scores for:
 Format: complexity:X, code:X, literature:X, novelty:X
 
 Analysis:"""
-        
-        response = self.llm.invoke(prompt)
-        
+    
+    def _decision(self, response: str) -> Dict:
+        """Scores, path and confidence from the LLM's routing response"""
         # Parse scores
         scores = self._parse_scores(response)
         
@@ -84,3 +329,53 @@ Analysis:"""
         avg_score = sum(scores.values()) / len(scores)
         # Higher average = higher confidence in understanding
         return round(avg_score / 10, 2)
+
+
+_pre_router = None
+
+
+def get_pre_router() -> PreRouter:
+    """Process-wide pre-router loaded from data/pre_router.json"""
+    global _pre_router
+    if _pre_router is None:
+        _pre_router = PreRouter()
+    return _pre_router
+
+
+def train_pre_router(min_examples: int = 30, path: str = "data/pre_router.json") -> bool:
+    """Fit the pre-router on the logged LLM decisions and report held-out path accuracy"""
+    queries, scores = load_routing_examples()
+    if len(queries) < min_examples:
+        print(f"Only {len(queries)} logged routing decisions; need {min_examples} to train")
+        return False
+    
+    # Hold out every fifth example to estimate how often confident predictions agree with the LLM
+    holdout = set(range(0, len(queries), 5))
+    train_idx = [i for i in range(len(queries)) if i not in holdout]
+    router = AdaptiveRouter(llm=None, use_cache=False, use_pre_router=False)
+    model = PreRouter(path=path + ".eval")
+    model.fit([queries[i] for i in train_idx], [scores[i] for i in train_idx])
+    confident = agree = 0
+    for i in holdout:
+        predicted, confidence = model.predict(queries[i])
+        if confidence >= model.min_confidence:
+            confident += 1
+            agree += router._determine_path(predicted) == router._determine_path(scores[i])
+    
+    model = PreRouter(path=path)
+    errors = model.fit(queries, scores)
+    model.save()
+    print(f"Trained pre-router on {len(queries)} decisions; score RMSE {errors}")
+    if holdout:
+        print(f"Held out: {confident}/{len(holdout)} confident, "
+              f"path agreement {agree}/{confident if confident else 0}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adaptive router utilities")
+    parser.add_argument("command", choices=["train"], help="train: refit the pre-router from the routing log")
+    parser.add_argument("--min-examples", type=int, default=30)
+    args = parser.parse_args()
+    if args.command == "train":
+        train_pre_router(min_examples=args.min_examples)
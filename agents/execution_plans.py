@@ -0,0 +1,51 @@
+"""
+Execution plans keyed by routing path
+Turns the AdaptiveRouter decision into concrete search, retrieval and prompt budgets
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """What the researcher, coder and reviewer do for one route"""
+
+    route: str
+    max_papers: int
+    # Papers whose PDFs are downloaded and mined for excerpts; 0 skips full text entirely
+    fulltext_papers: int
+    excerpt_count: int = 4
+    # Extra search angles fanned out alongside the main query
+    extra_queries: Tuple[str, ...] = ()
+    summary_chars: int = 200
+    # Token budgets for the prompt sections each stage sends to the LLM
+    paper_tokens: int = 900
+    excerpt_tokens: int = 500
+    code_context_tokens: int = 100
+    review_code_tokens: int = 120
+
+
+PLANS = {
+    # Most traffic: abstracts only, no PDF downloads or chunk embeddings
+    'standard': ExecutionPlan('standard', max_papers=5, fulltext_papers=0, excerpt_count=0,
+                              summary_chars=150, paper_tokens=600, excerpt_tokens=0),
+    'exploratory': ExecutionPlan('exploratory', max_papers=7, fulltext_papers=2,
+                                 extra_queries=('emerging directions',), excerpt_tokens=400,
+                                 code_context_tokens=120),
+    'code_focused': ExecutionPlan('code_focused', max_papers=5, fulltext_papers=2,
+                                  extra_queries=('implementation',), paper_tokens=700, excerpt_tokens=400,
+                                  code_context_tokens=350, review_code_tokens=400),
+    'deep_research': ExecutionPlan('deep_research', max_papers=10, fulltext_papers=4, excerpt_count=6,
+                                   extra_queries=('survey', 'benchmark evaluation'), summary_chars=300,
+                                   paper_tokens=1500, excerpt_tokens=800, code_context_tokens=180,
+                                   review_code_tokens=220)
+}
+
+# Used when no route is known, e.g. the REST endpoint: the pre-routing behaviour
+DEFAULT_PLAN = ExecutionPlan('default', max_papers=7, fulltext_papers=3)
+
+
+def get_plan(route: str) -> ExecutionPlan:
+    """Plan for a routing path; unknown routes fall back to the standard plan"""
+    return PLANS.get(route, PLANS['standard'])
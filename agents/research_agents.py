@@ -1,51 +1,140 @@
 from langchain_core.messages import AIMessage
 from langchain_ollama import OllamaLLM
+import asyncio
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 from tools.paper_tools import PaperSearchTool
 from tools.metrics import ResearchMetrics
 from tools.query_enhancer import QueryEnhancer
+from tools.chunk_retriever import FullTextRetriever
+from tools.dedup import dedupe_papers
+from tools.llm_stream import generate, agenerate
+from tools.prompt_budget import PromptBudget, Section, get_token_counter
+from agents.execution_plans import ExecutionPlan, DEFAULT_PLAN
+from concurrent.futures import ThreadPoolExecutor
 
 class EnhancedResearcherAgent:
     """Researcher agent with ArXiv paper search"""
     
-    def __init__(self, llm: OllamaLLM):
+    def __init__(self, llm: OllamaLLM, use_fulltext: bool = True, plan: ExecutionPlan = None,
+                 paper_tool: PaperSearchTool = None, retriever: FullTextRetriever = None,
+                 query_enhancer: QueryEnhancer = None):
         self.llm = llm
-        self.paper_tool = PaperSearchTool(max_results=7)
-        self.query_enhancer = QueryEnhancer()
+        self.plan = plan or DEFAULT_PLAN
+        self.paper_tool = paper_tool or PaperSearchTool(max_results=self.plan.max_papers)
+        self.query_enhancer = query_enhancer or QueryEnhancer()
+        self.budget = PromptBudget(get_token_counter(getattr(llm, 'model', 'llama3.2:3b')))
+        self.use_fulltext = use_fulltext and self.plan.fulltext_papers > 0
+        if self.use_fulltext:
+            self.retriever = retriever or FullTextRetriever(self.paper_tool.extractor)
+        else:
+            self.retriever = None
     
-    def research(self, query: str) -> dict:
-        """Perform comprehensive research with quality metrics"""
+    def stream_papers(self, query: str):
+        """Yield papers for a query as each search source produces them"""
+        enhanced_query = self.query_enhancer.enhance_query(query)
+        yield from self.paper_tool.iter_papers(enhanced_query)
 
-        # Enhance query for better results
-        enhanced_query = self.query_enhancer.enhance_query(query) 
+    def _expand(self, query: str, papers: list) -> list:
+        """Fan out the plan's extra search angles and merge them into `papers`"""
+        if not self.plan.extra_queries or (papers and 'error' in papers[0]):
+            return papers
+        
+        angles = [self.query_enhancer.enhance_query(f"{query} {extra}") for extra in self.plan.extra_queries]
+        with ThreadPoolExecutor(max_workers=len(angles)) as pool:
+            extra_results = list(pool.map(self.paper_tool.search_papers, angles))
+        
+        # Interleave by rank across angles so every angle keeps slots after truncation;
+        # appending would let the primary search alone fill max_papers
+        ranked = [list(papers)] + [results for results in extra_results
+                                   if results and 'error' not in results[0]]
+        merged = [group[i] for i in range(max(map(len, ranked))) for group in ranked if i < len(group)]
+        return dedupe_papers(merged)[:self.plan.max_papers]
 
-        # Search papers
-        papers = self.paper_tool.search_papers(enhanced_query)
-        paper_summary = self.paper_tool.format_paper_summary(papers)
+    def research(self, query: str, papers: list = None, on_token=None) -> dict:
+        """Perform comprehensive research with quality metrics
+        
+        Pass `papers` (e.g. collected from stream_papers) to skip the search step,
+        and `on_token` to receive the LLM summary as it is generated.
+        """
+        context = self._prepare(query, papers)
+        llm_summary = generate(self.llm, context['prompt'], on_token)
+        return self._result(context, llm_summary)
+    
+    async def aresearch(self, query: str, papers: list = None, on_token=None) -> dict:
+        """research() for the event loop: search and retrieval run in a worker thread,
+        the LLM summary is generated with the async client"""
+        context = await asyncio.to_thread(self._prepare, query, papers)
+        llm_summary = await agenerate(self.llm, context['prompt'], on_token)
+        return self._result(context, llm_summary)
+    
+    def _prepare(self, query: str, papers: list = None) -> dict:
+        """Everything before the LLM call: search, scoring, excerpts and the prompt"""
+        if papers is None:
+            # Enhance query for better results
+            enhanced_query = self.query_enhancer.enhance_query(query) 
+
+            # Search papers
+            papers = self.paper_tool.search_papers(enhanced_query)
+        search_status = dict(self.paper_tool.last_search_status)
+        papers = self._expand(query, papers)
+        paper_summary = self.paper_tool.format_paper_summary(papers, self.plan.summary_chars)
     
         # Calculate quality metrics
         metrics_tracker = ResearchMetrics()
         quality_metrics = metrics_tracker.calculate_paper_quality(papers)
         metrics_tracker.save_metrics(quality_metrics, query)
     
+        # Ground the summary in the most relevant full-text passages
+        excerpts = []
+        if self.retriever and papers:
+            try:
+                excerpts = self.retriever.retrieve(query, papers, max_papers=self.plan.fulltext_papers,
+                                                   top_k=self.plan.excerpt_count)
+            except Exception as e:
+                print(f"Full-text retrieval error: {e}")
+    
+        # Pack the prompt within the plan's token budget: best-ranked papers and
+        # highest-scoring excerpts first, with full abstracts where they fit
+        valid = papers if papers and 'error' not in papers[0] else []
+        packed = self.budget.pack("researcher", [
+            Section("papers", [self.paper_tool.format_paper_entry(i, p, summary_chars=None)
+                               for i, p in enumerate(valid, 1)], self.plan.paper_tokens),
+            Section("excerpts", [FullTextRetriever.format_chunk(i, c)
+                                 for i, c in enumerate(sorted(excerpts, key=lambda c: -c['score']), 1)],
+                    self.plan.excerpt_tokens)
+        ])
+        paper_text = f"## Found Research Papers:\n\n{packed.sections['papers']}" if packed.sections['papers'] else paper_summary
+        excerpt_text = f"## Relevant Excerpts:\n\n{packed.sections['excerpts']}" if packed.sections['excerpts'] else ""
+    
         # Generate LLM summary
         prompt = f"""Based on these {len(papers)} academic papers (Quality Grade: {quality_metrics['grade']}), provide a comprehensive summary about "{query}":
 
-    {paper_summary}
-
+    {paper_text}
+    {excerpt_text}
     Summary:"""
     
-        llm_summary = self.llm.invoke(prompt)
-    
-        result = {
+        return {
             'papers': papers,
             'paper_summary': paper_summary,
+            'quality_metrics': quality_metrics,
+            'search_status': search_status,
+            'excerpts': excerpts,
+            'prompt': prompt
+        }
+    
+    def _result(self, context: dict, llm_summary: str) -> dict:
+        quality_metrics = context['quality_metrics']
+        result = {
+            'papers': context['papers'],
+            'paper_summary': context['paper_summary'],
             'llm_summary': llm_summary,
             'quality_metrics': quality_metrics,
-            'full_summary': f"**Research Quality: {quality_metrics['grade']} ({quality_metrics['overall_score']}/10)**\n\n{paper_summary}\n\n**Analysis:**\n{llm_summary}"
+            'search_status': context['search_status'],
+            'plan': self.plan.route,
+            'excerpts': context['excerpts'],
+            'full_summary': f"**Research Quality: {quality_metrics['grade']} ({quality_metrics['overall_score']}/10)**\n\n{context['paper_summary']}\n\n**Analysis:**\n{llm_summary}"
         }
     
         return result
-
@@ -0,0 +1,136 @@
+"""
+Semantic routing cache
+Reuses AdaptiveRouter decisions for queries whose embeddings are near-identical
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from tools.embeddings import Embedder, get_embedder
+
+
+class RoutingCache:
+    """Embedding-keyed cache of routing decisions with LRU eviction and persistence"""
+
+    def __init__(self, embedder: Embedder = None, threshold: float = 0.92, max_entries: int = 2000,
+                 path: str = "data/routing_cache", near_miss_margin: float = 0.05):
+        self.embedder = embedder or get_embedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.near_miss_margin = near_miss_margin
+        self.root = Path(path)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        # Misses that were within near_miss_margin of the threshold; guides threshold tuning
+        self.near_misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = []  # {query, decision, last_used}
+        self._vectors = None
+        self._load()
+
+    def _load(self):
+        entries_file = self.root / "entries.json"
+        vectors_file = self.root / "vectors.npy"
+        if not (entries_file.exists() and vectors_file.exists()):
+            return
+        try:
+            with open(entries_file, 'r') as f:
+                entries = json.load(f)
+            vectors = np.load(vectors_file)
+        except (OSError, ValueError) as e:
+            print(f"Routing cache unreadable, starting empty: {e}")
+            return
+        if len(entries) == len(vectors):
+            self._entries, self._vectors = entries, vectors
+
+    def _save(self):
+        # Called with the lock held; entries and vectors are swapped in together
+        tmp_entries = self.root / f".entries.{uuid.uuid4().hex}.tmp"
+        tmp_vectors = self.root / f".vectors.{uuid.uuid4().hex}.npy"
+        with open(tmp_entries, 'w') as f:
+            json.dump(self._entries, f)
+        np.save(tmp_vectors, self._vectors)
+        os.replace(tmp_vectors, self.root / "vectors.npy")
+        os.replace(tmp_entries, self.root / "entries.json")
+
+    def lookup(self, query: str) -> Tuple[Optional[Dict], np.ndarray, float]:
+        """Return (decision or None, query vector, best similarity); the vector is None without embeddings"""
+        if not self.embedder.available():
+            return None, None, 0.0
+        vector = self.embedder.embed_query(query)
+
+        with self._lock:
+            if self._vectors is None or not len(self._entries):
+                self.misses += 1
+                return None, vector, 0.0
+
+            similarities = self._vectors @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity >= self.threshold:
+                self.hits += 1
+                self._entries[best]['last_used'] = time.time()
+                return dict(self._entries[best]['decision']), vector, similarity
+
+            self.misses += 1
+            if similarity >= self.threshold - self.near_miss_margin:
+                self.near_misses += 1
+            return None, vector, similarity
+
+    def put(self, query: str, decision: Dict, vector: np.ndarray = None):
+        """Store a decision, evicting the least recently used entry when full"""
+        if vector is None:
+            vector = self.embedder.embed_query(query)
+
+        with self._lock:
+            entry = {'query': query, 'decision': decision, 'last_used': time.time()}
+            if self._vectors is None:
+                self._vectors = vector.reshape(1, -1).astype(np.float32)
+                self._entries = [entry]
+            elif len(self._entries) < self.max_entries:
+                self._vectors = np.vstack([self._vectors, vector.reshape(1, -1)])
+                self._entries.append(entry)
+            else:
+                oldest = min(range(len(self._entries)), key=lambda i: self._entries[i]['last_used'])
+                self._vectors[oldest] = vector
+                self._entries[oldest] = entry
+            self._save()
+
+    def stats(self) -> Dict:
+        """Hit rate, threshold and size"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'near_misses': self.near_misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'threshold': self.threshold,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries
+        }
+
+
+_routing_cache = None
+_routing_cache_lock = threading.Lock()
+
+
+def get_routing_cache() -> RoutingCache:
+    """Process-wide routing cache"""
+    global _routing_cache
+    with _routing_cache_lock:
+        if _routing_cache is None:
+            _routing_cache = RoutingCache()
+    return _routing_cache
@@ -0,0 +1,92 @@
+"""
+Long-lived API components
+Built once at startup and shared by every request: router, search/PDF stack, metrics and warm-up state
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from agents.adaptive_router import AdaptiveRouter
+from agents.execution_plans import ExecutionPlan, DEFAULT_PLAN
+from agents.research_agents import EnhancedResearcherAgent
+from agents.routing_cache import get_routing_cache
+from tools.chunk_retriever import FullTextRetriever
+from tools.metrics_writer import get_metrics_writer
+from tools.pdf_extract import PDFExtractor
+from tools.pdf_store import PDFStore, get_http_session
+from tools.paper_tools import PaperSearchTool
+from tools.query_enhancer import QueryEnhancer
+from tools.search_cache import SearchCache
+
+WARMUP_PROMPT = "Reply with the single word: ready"
+
+
+class Components:
+    """Shared agent components; per-request researchers are thin views over them"""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.http_session = get_http_session()
+        self.search_cache = SearchCache()
+        self.pdf_store = PDFStore(root="data/papers", session=self.http_session)
+        self.extractor = PDFExtractor(store=self.pdf_store)
+        self.retriever = FullTextRetriever(self.extractor)
+        self.query_enhancer = QueryEnhancer()
+        self.router = AdaptiveRouter(llm)
+        self.metrics_writer = get_metrics_writer()
+
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+        self.started_at = time.time()
+
+    def researcher(self, plan: ExecutionPlan = None) -> EnhancedResearcherAgent:
+        """Researcher for one request; only the plan-sized search front end is new"""
+        plan = plan or DEFAULT_PLAN
+        paper_tool = PaperSearchTool(max_results=plan.max_papers, cache=self.search_cache,
+                                     pdf_store=self.pdf_store, extractor=self.extractor)
+        return EnhancedResearcherAgent(self.llm, plan=plan, paper_tool=paper_tool,
+                                       retriever=self.retriever, query_enhancer=self.query_enhancer)
+
+    async def warm_up(self, retry_delay: float = 5.0, max_delay: float = 60.0):
+        """Load the model (and embedding model) before traffic arrives; retries until it succeeds"""
+        delay = retry_delay
+        while True:
+            start = time.perf_counter()
+            try:
+                await self.llm.ainvoke(WARMUP_PROMPT, use_cache=False)
+                break
+            except Exception as e:
+                self.warmup_error = str(e)
+                print(f"LLM warm-up failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+
+        self.warmup_seconds = round(time.perf_counter() - start, 2)
+        self.warmup_error = None
+        self.ready = True
+        print(f"LLM warm-up finished in {self.warmup_seconds}s")
+
+        # Embeddings back the routing cache, paper index and excerpts; they are optional,
+        # and the probe logs how to install the model when it is missing
+        try:
+            await asyncio.to_thread(lambda: get_routing_cache().embedder.available())
+        except Exception as e:
+            print(f"Embedding warm-up skipped: {e}")
+
+    def health(self) -> Dict:
+        return {
+            'ready': self.ready,
+            'warmup_seconds': self.warmup_seconds,
+            'warmup_error': self.warmup_error,
+            'uptime_seconds': round(time.time() - self.started_at, 1)
+        }
+
+    def close(self):
+        """Drain queued metrics to disk"""
+        self.metrics_writer.close()
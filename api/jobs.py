@@ -0,0 +1,170 @@
+"""
+Research job queue
+Bounded asyncio worker pool behind the job API: submit, poll or long-poll, fetch the result
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tools.metrics_aggregates import RunningStats
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the backlog is at capacity"""
+
+
+class Job:
+    """One queued research request and its outcome"""
+
+    def __init__(self, payload: Dict):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.result = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.finished = asyncio.Event()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def to_dict(self) -> Dict:
+        def seconds(start, end):
+            return round(end - start, 3) if start and end else None
+
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'wait_seconds': seconds(self.submitted_at, self.started_at or (time.time() if self.status == 'queued' else None)),
+            'run_seconds': seconds(self.started_at, self.finished_at or (time.time() if self.status == 'running' else None)),
+            'error': self.error
+        }
+
+
+class JobQueue:
+    """Runs submitted jobs on `workers` concurrent tasks, oldest first
+
+    At most `max_queued` jobs wait at once; finished jobs are kept (for result
+    pickup) up to `keep_finished`, oldest evicted first.
+    """
+
+    def __init__(self, runner: Callable[[Job], Awaitable], workers: int = None, max_queued: int = None,
+                 keep_finished: int = 1000):
+        self.runner = runner
+        self.workers = workers or int(os.environ.get("IMARA_JOB_WORKERS", "2"))
+        self.max_queued = max_queued or int(os.environ.get("IMARA_JOB_MAX_QUEUED", "100"))
+        self.keep_finished = keep_finished
+
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_stats = RunningStats()
+        self.run_stats = RunningStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self):
+        """Spawn the workers on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload: Dict) -> Job:
+        """Enqueue a job without waiting; raises QueueFull when the backlog is full"""
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been called")
+        job = Job(payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(f"{self.max_queued} jobs already queued")
+        self.jobs[job.id] = job
+        self._evict()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def position(self, job: Job) -> Optional[int]:
+        """1-based place in line for a queued job"""
+        if job.status != 'queued':
+            return None
+        return 1 + sum(1 for other in self.jobs.values()
+                       if other.status == 'queued' and other.submitted_at < job.submitted_at)
+
+    async def wait(self, job: Job, timeout: float) -> bool:
+        """Long-poll: block up to `timeout` seconds for the job to finish"""
+        if job.is_finished or timeout <= 0:
+            return job.is_finished
+        try:
+            await asyncio.wait_for(job.finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job.is_finished
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = 'running'
+            job.started_at = time.time()
+            self.running += 1
+            self.wait_stats.add(job.started_at - job.submitted_at)
+            try:
+                job.result = await self.runner(job)
+                job.status = 'done'
+                self.completed += 1
+            except asyncio.CancelledError:
+                job.status = 'failed'
+                job.error = 'cancelled at shutdown'
+                raise
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                self.running -= 1
+                self.run_stats.add(job.finished_at - job.started_at)
+                job.finished.set()
+                self._queue.task_done()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished]
+        for job_id in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self.jobs[job_id]
+
+    def stats(self) -> Dict:
+        """Queue depth, concurrency and wait/run-time distributions"""
+        oldest = min((job.submitted_at for job in self.jobs.values() if job.status == 'queued'), default=None)
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'max_queued': self.max_queued,
+            'running': self.running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'oldest_queued_seconds': round(time.time() - oldest, 3) if oldest else None,
+            'wait_seconds': self.wait_stats.summary(),
+            'run_seconds': self.run_stats.summary()
+        }
@@ -1,20 +1,70 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import sys
 from pathlib import Path
 import asyncio
 import json
+import time
 
 # Add parent to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from langchain_ollama import OllamaLLM
-from agents.research_agents import EnhancedResearcherAgent
-from agents.adaptive_router import AdaptiveRouter
+from tools.llm_backends import create_llm
+from contextlib import asynccontextmanager, nullcontext
+from api.components import Components
+from api.jobs import Job, JobQueue, QueueFull
+from agents.routing_cache import get_routing_cache
+from agents.execution_plans import get_plan
 from tools.metrics import ResearchMetrics
+from tools.metrics_aggregates import get_metrics_aggregates
+from tools.metrics_writer import get_metrics_writer
+from tools.llm_cache import CachedLLM, bypass_cache, bypass_cache_for_task
+from tools.llm_stream import agenerate
+from tools.prompt_budget import PromptBudget, get_token_counter
+from tools.llm_scheduler import (LLMScheduler, llm_priority, PRIORITY_ROUTER, PRIORITY_REVIEW,
+                                 PRIORITY_CODE)
 
-app = FastAPI(title="IMARA API", version="2.0")
+# Initialize the configured LLM backend (IMARA_LLM_BACKEND: ollama, hf or fake).
+# Identical prompts replay from data/llm_cache.db, and cache misses wait their
+# turn in the scheduler so concurrent sessions don't overload Ollama.
+scheduler = LLMScheduler(create_llm())
+llm = CachedLLM(scheduler)
+prompt_budget = PromptBudget(get_token_counter(llm.model))
+
+# Longest a status request may block waiting for its job (seconds)
+MAX_LONG_POLL = 60.0
+
+async def run_research_job(job: Job) -> dict:
+    """Job runner for the REST API: one researcher pass over the queued query"""
+    researcher = app.state.components.researcher()
+    with nullcontext() if job.payload['use_cache'] else bypass_cache():
+        result = await researcher.aresearch(job.payload['query'])
+    return {
+        "summary": result['full_summary'],
+        "metrics": result.get('quality_metrics', {}),
+        "papers": len(result.get('papers', []))
+    }
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared components once, warm the model up, and drain metrics on shutdown"""
+    # Sync LLM calls from worker threads are scheduled on this loop
+    scheduler.attach()
+    components = await asyncio.to_thread(Components, llm)
+    app.state.components = components
+    app.state.jobs = JobQueue(run_research_job)
+    app.state.jobs.start()
+    warmup = asyncio.create_task(components.warm_up())
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        await app.state.jobs.stop()
+        await asyncio.to_thread(components.close)
+
+app = FastAPI(title="IMARA API", version="2.0", lifespan=lifespan)
 
 # CORS for React frontend
 app.add_middleware(
@@ -25,11 +75,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize LLM
-llm = OllamaLLM(model="llama3.2:3b", temperature=0.7)
-
 class ResearchRequest(BaseModel):
     query: str
+    use_cache: bool = True
 
 class AgentStatus(BaseModel):
     agent: str
@@ -47,7 +95,81 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "llm": "llama3.2:3b"}
+    """Ready (200) only once the model has been warmed up; 503 until then"""
+    state = app.state.components.health()
+    body = {"status": "healthy" if state['ready'] else "warming_up", "llm": llm.model, **state}
+    return JSONResponse(body, status_code=200 if state['ready'] else 503)
+
+@app.get("/api/metrics/summary")
+async def metrics_summary(days: int = 30, clusters: int = 20):
+    """Rolling quality-score aggregates over the research history"""
+    summary = await asyncio.to_thread(
+        get_metrics_aggregates().summary, days=days, top_clusters=clusters
+    )
+    summary["writer"] = get_metrics_writer().stats()
+    return summary
+
+@app.get("/api/routing/cache")
+async def routing_cache_stats():
+    """Routing cache hit rate, threshold and size"""
+    return await asyncio.to_thread(lambda: get_routing_cache().stats())
+
+@app.get("/api/llm/cache")
+async def llm_cache_stats():
+    """LLM response cache hits, misses and tokens saved"""
+    return await asyncio.to_thread(llm.stats)
+
+@app.get("/api/llm/scheduler")
+async def llm_scheduler_stats():
+    """In-flight generations, queue depth and queue-wait percentiles per priority"""
+    return scheduler.stats()
+
+class TokenCoalescer:
+    """Forward LLM chunks as `agent_token` events without sending one frame per token
+    
+    The first delta goes out immediately; after that, deltas are batched until
+    `flush_interval` seconds pass or `flush_chars` characters accumulate.
+    """
+    
+    def __init__(self, websocket: WebSocket, agent: str, flush_interval: float = 0.05,
+                 flush_chars: int = 64):
+        self.websocket = websocket
+        self.agent = agent
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self._buffer = []
+        self._buffered = 0
+        self._sent_first = False
+        self._last_flush = time.monotonic()
+    
+    async def add(self, chunk: str):
+        self._buffer.append(chunk)
+        self._buffered += len(chunk)
+        if (not self._sent_first or self._buffered >= self.flush_chars
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self._sent_first = True
+            await self.flush()
+    
+    async def flush(self):
+        if self._buffer:
+            await self.websocket.send_json({"type": "agent_token", "agent": self.agent,
+                                            "delta": ''.join(self._buffer)})
+            self._buffer, self._buffered = [], 0
+        self._last_flush = time.monotonic()
+
+async def stream_stage(websocket: WebSocket, agent: str, prompt: str) -> str:
+    """Generate with the async LLM client, streaming coalesced tokens to the client"""
+    coalescer = TokenCoalescer(websocket, agent)
+    text = await agenerate(llm, prompt, coalescer.add)
+    await coalescer.flush()
+    return text
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except (WebSocketDisconnect, RuntimeError):
+        pass
 
 @app.websocket("/ws/research")
 async def research_websocket(websocket: WebSocket):
@@ -57,7 +179,28 @@ async def research_websocket(websocket: WebSocket):
     try:
         # Receive query
         data = await websocket.receive_json()
+    except WebSocketDisconnect:
+        return
+    
+    # Watch for the client leaving so its queued and running LLM calls are cancelled
+    session = asyncio.create_task(_research_session(websocket, data))
+    watcher = asyncio.create_task(_wait_for_disconnect(websocket))
+    done, _ = await asyncio.wait({session, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    if session not in done:
+        print("Client disconnected, cancelling research")
+        session.cancel()
+    watcher.cancel()
+    try:
+        await session
+    except asyncio.CancelledError:
+        pass
+
+async def _research_session(websocket: WebSocket, data: dict):
+    """Route, research, code and review one query, streaming progress to the client"""
+    try:
         query = data.get("query", "")
+        if not data.get("use_cache", True):
+            bypass_cache_for_task()
         
         # Send start message
         await websocket.send_json({
@@ -72,18 +215,40 @@ async def research_websocket(websocket: WebSocket):
             "progress": 25
         })
         
-        researcher = EnhancedResearcherAgent(llm)
-        router = AdaptiveRouter(llm)
+        components = app.state.components
         
-        # Routing analysis
-        routing_info = router.analyze_query(query)
+        # Routing analysis picks the execution plan for the rest of the pipeline.
+        # Blocking work (embeddings, SQLite, sync clients) runs in worker threads so the
+        # event loop keeps serving other sessions; the routing LLM call itself stays in
+        # this task so a disconnect cancels it and frees its scheduler slot.
+        with llm_priority(PRIORITY_ROUTER):
+            routing_info = await components.router.aanalyze_query(query)
+        plan = get_plan(routing_info['path'])
         await websocket.send_json({
             "type": "routing",
-            "data": routing_info
+            "data": {**routing_info, "plan": plan.route}
         })
         
+        researcher = components.researcher(plan)
+        
+        # Stream papers to the client as each source returns them
+        papers = []
+        paper_stream = researcher.stream_papers(query)
+        while True:
+            paper = await asyncio.to_thread(next, paper_stream, None)
+            if paper is None:
+                break
+            papers.append(paper)
+            await websocket.send_json({
+                "type": "paper_found",
+                "data": paper.to_dict(),
+                "count": len(papers)
+            })
+        
         # Research
-        result = researcher.research(query)
+        coalescer = TokenCoalescer(websocket, "researcher")
+        result = await researcher.aresearch(query, papers=papers, on_token=coalescer.add)
+        await coalescer.flush()
         await websocket.send_json({
             "type": "agent_complete",
             "agent": "researcher",
@@ -102,8 +267,10 @@ async def research_websocket(websocket: WebSocket):
             "progress": 50
         })
         
-        code_prompt = f"Generate Python multi-agent code based on: {result['llm_summary'][:300]}"
-        code = llm.invoke(code_prompt)
+        research_context = prompt_budget.fit("coder", "research", result['llm_summary'], plan.code_context_tokens)
+        code_prompt = f"Generate Python multi-agent code based on: {research_context}"
+        with llm_priority(PRIORITY_CODE):
+            code = await stream_stage(websocket, "coder", code_prompt)
         
         await websocket.send_json({
             "type": "agent_complete",
@@ -119,8 +286,9 @@ async def research_websocket(websocket: WebSocket):
             "progress": 75
         })
         
-        review_prompt = f"Review this code: {code[:400]}"
-        review = llm.invoke(review_prompt)
+        review_prompt = f"Review this code: {prompt_budget.fit('reviewer', 'code', code, plan.review_code_tokens)}"
+        with llm_priority(PRIORITY_REVIEW):
+            review = await stream_stage(websocket, "reviewer", review_prompt)
         
         await websocket.send_json({
             "type": "agent_complete",
@@ -152,23 +320,52 @@ async def research_websocket(websocket: WebSocket):
             "message": str(e)
         })
 
-@app.post("/api/research")
+def _job_status(job: Job) -> dict:
+    return {
+        **job.to_dict(),
+        "queue_position": app.state.jobs.position(job),
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result"
+    }
+
+def _get_job(job_id: str) -> Job:
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job
+
+@app.post("/api/research", status_code=202)
 async def research(request: ResearchRequest):
-    """Standard REST endpoint for research"""
+    """Queue a research job; poll its status_url and fetch result_url when done"""
     try:
-        researcher = EnhancedResearcherAgent(llm)
-        result = researcher.research(request.query)
-        
-        return {
-            "success": True,
-            "data": {
-                "summary": result['full_summary'],
-                "metrics": result.get('quality_metrics', {}),
-                "papers": len(result.get('papers', []))
-            }
-        }
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+        job = app.state.jobs.submit({"query": request.query, "use_cache": request.use_cache})
+    except QueueFull as e:
+        return JSONResponse({"success": False, "error": f"Research queue is full: {e}"},
+                            status_code=429, headers={"Retry-After": "30"})
+    return {"success": True, **_job_status(job)}
+
+@app.get("/api/jobs")
+async def job_queue_stats():
+    """Queue depth, running jobs and wait/run-time percentiles"""
+    return app.state.jobs.stats()
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str, wait: float = 0):
+    """Job status; with `wait`, long-poll up to that many seconds for the job to finish"""
+    job = _get_job(job_id)
+    await app.state.jobs.wait(job, min(max(wait, 0), MAX_LONG_POLL))
+    return _job_status(job)
+
+@app.get("/api/jobs/{job_id}/result")
+async def job_result(job_id: str, wait: float = 0):
+    """Finished job's result (200), or its status (202) while it is still queued or running"""
+    job = _get_job(job_id)
+    await app.state.jobs.wait(job, min(max(wait, 0), MAX_LONG_POLL))
+    if job.status == 'done':
+        return {"success": True, "data": job.result}
+    if job.status == 'failed':
+        return {"success": False, "error": job.error}
+    return JSONResponse(_job_status(job), status_code=202)
 
 if __name__ == "__main__":
     import uvicorn
@@ -15,6 +15,8 @@ const ResearchInterface = ({ onBack }) => {
     const [finalReport, setFinalReport] = useState(null);
     const [metrics, setMetrics] = useState(null);
     const [routing, setRouting] = useState(null);
+    const [papersFound, setPapersFound] = useState([]);
+    const [liveOutput, setLiveOutput] = useState({});
     const resultsRef = useRef(null);
 
     const agents = [
@@ -33,6 +35,8 @@ const ResearchInterface = ({ onBack }) => {
         setFinalReport(null);
         setMetrics(null);
         setRouting(null);
+        setPapersFound([]);
+        setLiveOutput({});
 
         try {
             const ws = new WebSocket('ws://localhost:8000/ws/research');
@@ -53,6 +57,17 @@ const ResearchInterface = ({ onBack }) => {
                         setRouting(data.data);
                         break;
 
+                    case 'paper_found':
+                        setPapersFound(prev => [...prev, data.data]);
+                        break;
+
+                    case 'agent_token':
+                        setLiveOutput(prev => ({
+                            ...prev,
+                            [data.agent]: (prev[data.agent] || '') + data.delta
+                        }));
+                        break;
+
                     case 'agent_start':
                         setCurrentAgent(data.agent);
                         setProgress(data.progress || 0);
@@ -192,6 +207,27 @@ const ResearchInterface = ({ onBack }) => {
                                 transition={{ duration: 0.5 }}
                             />
                         </div>
+                        {papersFound.length > 0 && !agentResults.researcher && (
+                            <ul className="mt-4 space-y-1">
+                                {papersFound.map((paper, i) => (
+                                    <motion.li
+                                        key={`${paper.pdf_url}-${i}`}
+                                        initial={{ opacity: 0, x: -10 }}
+                                        animate={{ opacity: 1, x: 0 }}
+                                        className="text-sm text-slate-300 flex items-center gap-2"
+                                    >
+                                        <FileSearch className="w-4 h-4 text-green-400 shrink-0" />
+                                        <span className="truncate">{paper.title}</span>
+                                        <span className="text-xs text-slate-500">{paper.source}</span>
+                                    </motion.li>
+                                ))}
+                            </ul>
+                        )}
+                        {liveOutput[currentAgent] && !agentResults[currentAgent] && (
+                            <pre className="mt-4 max-h-64 overflow-y-auto whitespace-pre-wrap text-sm text-slate-300 font-mono">
+                                {liveOutput[currentAgent]}
+                            </pre>
+                        )}
                     </div>
                 </div>
             )}
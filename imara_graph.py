@@ -1,15 +1,17 @@
 from typing import Literal
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langchain_core.messages import AIMessage, HumanMessage
-from transformers import pipeline
+import os
+from tools.llm_backends import create_llm
 
-# Setup the local HuggingFace LLM (distilgpt2 for demo)
-hf_pipe = pipeline("text-generation", model="distilgpt2", max_new_tokens=40)
+# Setup the local LLM (HuggingFace distilgpt2 for demo unless IMARA_LLM_BACKEND says otherwise)
+backend = os.environ.get("IMARA_LLM_BACKEND", "hf")
+llm = create_llm(backend, **({"max_new_tokens": 40} if backend == "hf" else {}))
 
 def researcher_agent(state: MessagesState) -> dict:
     # Access message content using .content attribute
     last_user_message = state["messages"][-1].content if state["messages"] else ""
-    response = hf_pipe(f"Search and summarize latest research on: {last_user_message}")[0]["generated_text"]
+    response = llm.invoke(f"Search and summarize latest research on: {last_user_message}")
     # Add AI assistant reply to message history
     messages = state["messages"] + [AIMessage(content=response)]
     return {"messages": messages}
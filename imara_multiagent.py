@@ -2,10 +2,12 @@ from typing import Literal
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_community.tools import DuckDuckGoSearchRun
-from transformers import pipeline
+import os
+from tools.llm_backends import create_llm
 
-# Initialize local LLM
-hf_pipe = pipeline("text-generation", model="distilgpt2", max_new_tokens=100, pad_token_id=50256)
+# Initialize local LLM (HuggingFace distilgpt2 unless IMARA_LLM_BACKEND says otherwise)
+backend = os.environ.get("IMARA_LLM_BACKEND", "hf")
+llm = create_llm(backend, **({"max_new_tokens": 100, "pad_token_id": 50256} if backend == "hf" else {}))
 
 # Initialize web search tool
 search_tool = DuckDuckGoSearchRun()
@@ -2,10 +2,13 @@ from typing import Literal
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_ollama import OllamaLLM
+from tools.llm_backends import create_llm
+from tools.llm_cache import CachedLLM
+from tools.prompt_budget import PromptBudget, get_token_counter
 
-# Initialize Ollama LLM (much better than distilgpt2)
-llm = OllamaLLM(model="llama3.2:3b", temperature=0.7)
+# Initialize the configured LLM (Ollama llama3.2:3b by default); repeated prompts replay from the cache
+llm = CachedLLM(create_llm())
+prompt_budget = PromptBudget(get_token_counter(llm.model))
 
 # Initialize web search tool
 search_tool = DuckDuckGoSearchRun()
@@ -26,7 +29,7 @@ def researcher_agent(state: AgentState) -> dict:
     # Perform web search
     try:
         search_results = search_tool.run(f"latest research papers on {last_message}")
-        search_summary = search_results[:800]
+        search_summary = prompt_budget.fit("researcher", "web_results", search_results, 200)
     except Exception as e:
         search_summary = "Unable to perform web search at this time."
     
@@ -53,7 +56,7 @@ def coder_agent(state: AgentState) -> dict:
     
     prompt = f"""You are an expert Python developer. Based on this research summary, generate a Python code skeleton for implementing a multi-agent system:
 
-Research: {research[:300]}
+Research: {prompt_budget.fit("coder", "research", research, 75)}
 
 Generate clean, well-commented Python code with proper structure. Keep it under 30 lines.
 
@@ -76,10 +79,10 @@ def reviewer_agent(state: AgentState) -> dict:
     
     prompt = f"""You are a senior code reviewer. Review the following:
 
-Research Summary: {research[:200]}
+Research Summary: {prompt_budget.fit("reviewer", "research", research, 50)}
 
 Code Generated:
-{code[:400]}
+{prompt_budget.fit("reviewer", "code", code, 100)}
 
 Provide a brief 2-3 sentence review focusing on quality, accuracy, and completeness.
 
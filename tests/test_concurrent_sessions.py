@@ -0,0 +1,109 @@
+"""
+Concurrency test for the research websocket
+N simultaneous sessions against the fake LLM backend must overlap, not queue behind each other
+"""
+
+import importlib
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+SESSIONS = 4
+SEARCH_SECONDS = 0.5  # blocking ArXiv stub; would stall the loop if run on it
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """TestClient over a fresh api.main using the fake backend and a scratch data/ dir"""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("IMARA_LLM_BACKEND", "fake")
+    monkeypatch.setenv("IMARA_FAKE_TTFT", "0.3")
+    monkeypatch.setenv("IMARA_FAKE_TOKENS_PER_SEC", "200")
+    monkeypatch.setenv("IMARA_FAKE_MAX_TOKENS", "40")
+    monkeypatch.setenv("IMARA_LLM_MAX_IN_FLIGHT", str(SESSIONS))
+    monkeypatch.chdir(tmp_path)  # caches and metrics go under tmp_path/data
+
+    from agents.execution_plans import PLANS
+    from tools.paper import Paper
+    from tools.paper_tools import PaperSearchTool
+
+    def fake_arxiv(self, query, max_results):
+        time.sleep(SEARCH_SECONDS)
+        for i in range(3):
+            yield Paper(title=f"{query} result {i}", summary="multi-agent systems", source='arxiv',
+                        published='2025-01-01')
+
+    monkeypatch.setattr(PaperSearchTool, "_iter_arxiv", fake_arxiv)
+    monkeypatch.setattr(PaperSearchTool, "_remember", lambda self, papers: None)
+
+    sys.modules.pop("api.main", None)
+    main = importlib.import_module("api.main")
+    # Abstract-only plan: no PDF downloads or embedding calls
+    monkeypatch.setattr(main, "get_plan", lambda route: PLANS['standard'])
+
+    with TestClient(main.app) as test_client:
+        router = main.app.state.components.router
+        router.use_cache = False
+        router.pre_router = None
+        deadline = time.time() + 10
+        while test_client.get("/health").status_code != 200:
+            assert time.time() < deadline, "model warm-up did not finish"
+            time.sleep(0.05)
+        yield test_client
+
+
+def run_session(client, query: str) -> list:
+    """One websocket session to completion; returns the event types received (errors with their message)"""
+    events = []
+    with client.websocket_connect("/ws/research") as websocket:
+        websocket.send_json({"query": query, "use_cache": False})
+        while True:
+            message = websocket.receive_json()
+            events.append(f"error: {message['message']}" if message["type"] == "error" else message["type"])
+            if message["type"] in ("complete", "error"):
+                return events
+
+
+def test_sessions_run_in_parallel(client):
+    start = time.perf_counter()
+    assert run_session(client, "baseline query")[-1] == "complete"
+    single = time.perf_counter() - start
+
+    results = {}
+    health = []
+    done = threading.Event()
+
+    def probe():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            status = client.get("/health").status_code
+            health.append((status, time.perf_counter() - t0))
+            time.sleep(0.05)
+
+    def session(i):
+        results[i] = run_session(client, f"concurrent query {i}")
+
+    prober = threading.Thread(target=probe)
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(SESSIONS)]
+    start = time.perf_counter()
+    prober.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    assert all(results.get(i, ["missing"])[-1] == "complete" for i in range(SESSIONS)), results
+    # Serial execution would take about SESSIONS x single
+    assert elapsed < 0.5 * SESSIONS * single, (elapsed, single)
+    # The event loop kept answering while sessions were searching and generating
+    assert health and all(status == 200 for status, _ in health)
+    assert max(seconds for _, seconds in health) < single / 2
@@ -0,0 +1,59 @@
+"""
+Near-duplicate merging
+Distinct papers with similar titles must survive; true duplicates across sources must merge
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tools.dedup import SeenPapers, dedupe_papers
+from tools.paper import Paper
+
+
+def arxiv(title: str, arxiv_id: str) -> Paper:
+    return Paper(title=title, pdf_url=f"http://arxiv.org/pdf/{arxiv_id}v1", source='arxiv')
+
+
+def test_version_numbers_keep_papers_apart():
+    for a, b in [("GPT-4 Technical Report", "GPT-3 Technical Report"),
+                 ("Qwen2 Technical Report", "Qwen2.5 Technical Report")]:
+        papers = [Paper(title=a, source='scholar'), Paper(title=b, source='scholar')]
+        assert len(dedupe_papers(papers)) == 2, (a, b)
+        seen = SeenPapers()
+        assert seen.add(papers[0]) and seen.add(papers[1]), (a, b)
+
+
+def test_different_arxiv_ids_never_merge():
+    # Identical normalized titles, but two distinct ArXiv records
+    papers = [arxiv("Scaling Laws for Neural Language Models", "2001.08361"),
+              arxiv("Scaling laws for neural language models", "2404.01234")]
+    assert len(dedupe_papers(papers)) == 2
+    seen = SeenPapers()
+    assert seen.add(papers[0]) and seen.add(papers[1])
+
+
+def test_cross_source_duplicates_merge():
+    papers = [
+        arxiv("Attention Is All You Need", "1706.03762"),
+        Paper(title="Attention is all you need.", summary="Longer scholar abstract text",
+              pdf_url="https://papers.nips.cc/paper/7181.pdf", source='scholar'),
+        Paper(title="A Survey of Large Language Model Based Autonomous Agents", source='arxiv',
+              pdf_url="http://arxiv.org/pdf/2308.11432v5"),
+        Paper(title="A survey on large language model based autonomous agents", source='scholar'),
+    ]
+    merged = dedupe_papers(papers)
+    assert len(merged) == 2
+    assert merged[0].pdf_url.startswith("http://arxiv.org/pdf/1706.03762")
+    assert merged[0].summary == "Longer scholar abstract text"
+
+
+def test_duplicate_behind_unrelated_bucket_member_merges():
+    title = "Graph Neural Networks for Molecular Property Prediction at Scale"
+    papers = [Paper(title="Graph Neural Networks for Traffic Forecasting in Smart Cities", source='arxiv'),
+              Paper(title=title, source='arxiv'),
+              Paper(title=title.replace("at Scale", "at Large Scale"), source='scholar')]
+    # Same result whichever record lands first in a shared LSH bucket
+    for order in ([0, 1, 2], [1, 0, 2], [2, 0, 1]):
+        assert len(dedupe_papers([papers[i] for i in order])) == 2
@@ -0,0 +1,151 @@
+"""
+Local lexical paper index
+On-disk (SQLite) inverted index with BM25 scoring over titles and summaries
+"""
+
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from tools.paper import Paper
+from tools.paper_index import paper_key
+
+# Keeps model names and versions together: gpt-4, llama3.2, t5-xxl
+_TOKEN = re.compile(r'[a-z0-9]+(?:[-.][a-z0-9]+)*')
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'we', 'with'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Incrementally updated BM25 index of fetched papers"""
+
+    def __init__(self, path: str = "data/bm25_index.db", k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                length INTEGER NOT NULL,
+                paper TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+        # Corpus statistics kept in memory so scoring needs only the postings lookup
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+        self._doc_count = count
+        self._total_length = total
+
+    def __len__(self) -> int:
+        return self._doc_count
+
+    def add(self, papers: List[Dict]) -> int:
+        """Index papers not seen before; returns how many were added"""
+        added = 0
+        with self._lock:
+            for paper in papers:
+                key = paper_key(paper)
+                if not key:
+                    continue
+                terms = tokenize(f"{paper.get('title', '')} {paper.get('summary', '')}")
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO docs (key, length, paper) VALUES (?, ?, ?)",
+                    (key, len(terms), json.dumps(Paper.from_dict(paper).to_dict()))
+                )
+                if cursor.rowcount == 0:
+                    continue
+
+                doc_id = cursor.lastrowid
+                self._conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in Counter(terms).items()]
+                )
+                self._doc_count += 1
+                self._total_length += len(terms)
+                added += 1
+            self._conn.commit()
+        return added
+
+    def search(self, query: str, k: int = 7, require_all: bool = False) -> List[tuple]:
+        """Top-k papers as (score, paper) pairs, best first
+
+        With `require_all=True` only papers containing every query term are returned.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            if self._doc_count == 0:
+                return []
+
+            placeholders = ','.join('?' * len(terms))
+            rows = self._conn.execute(
+                f"SELECT p.term, p.doc_id, p.tf, d.length FROM postings p "
+                f"JOIN docs d ON d.id = p.doc_id WHERE p.term IN ({placeholders})",
+                tuple(terms)
+            ).fetchall()
+
+            n = self._doc_count
+            avg_length = self._total_length / n
+            doc_freq = Counter(term for term, _, _, _ in rows)
+
+            scores = {}
+            matched = Counter()
+            for term, doc_id, tf, length in rows:
+                matched[doc_id] += 1
+                df = doc_freq[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            if require_all:
+                scores = {d: score for d, score in scores.items() if matched[d] == len(terms)}
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not top:
+                return []
+
+            papers = dict(self._conn.execute(
+                f"SELECT id, paper FROM docs WHERE id IN ({','.join('?' * len(top))})",
+                tuple(doc_id for doc_id, _ in top)
+            ).fetchall())
+
+        return [(round(score, 3), Paper.from_dict(json.loads(papers[doc_id]))) for doc_id, score in top]
+
+
+_bm25_index = None
+_bm25_index_lock = threading.Lock()
+
+
+def get_bm25_index() -> BM25Index:
+    """Process-wide BM25 index"""
+    global _bm25_index
+    with _bm25_index_lock:
+        if _bm25_index is None:
+            _bm25_index = BM25Index()
+    return _bm25_index
@@ -0,0 +1,99 @@
+"""
+Full-text chunk retrieval
+Splits extracted paper text into overlapping chunks and selects the top-k for a query
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from tools.embeddings import Embedder, get_embedder
+from tools.pdf_extract import PDFExtractor
+
+
+def chunk_text(text: str, chunk_words: int = 150, overlap: int = 30) -> List[str]:
+    """Split text into word windows of `chunk_words` that overlap by `overlap` words"""
+    words = text.split()
+    if not words:
+        return []
+
+    step = max(chunk_words - overlap, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(' '.join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+class FullTextRetriever:
+    """Retrieve the paper passages most relevant to a query"""
+
+    def __init__(self, extractor: PDFExtractor, embedder: Embedder = None, top_k: int = 4,
+                 chunk_words: int = 150, overlap: int = 30,
+                 cache_dir: str = "data/chunk_embeddings"):
+        self.extractor = extractor
+        self.embedder = embedder or get_embedder()
+        self.top_k = top_k
+        self.chunk_words = chunk_words
+        self.overlap = overlap
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _chunk_vectors(self, sha256: str, chunks: List[str]) -> np.ndarray:
+        """Embeddings for one document's chunks, cached per PDF hash and chunking"""
+        path = self.cache_dir / f"{sha256}-{self.embedder.model.replace(':', '_')}-{self.chunk_words}-{self.overlap}.npy"
+        if path.exists():
+            vectors = np.load(path)
+            if len(vectors) == len(chunks):
+                return vectors
+
+        vectors = self.embedder.embed(chunks)
+        np.save(path, vectors)
+        return vectors
+
+    def retrieve(self, query: str, papers: List[Dict], max_papers: int = 3, top_k: int = None) -> List[Dict]:
+        """Top-k chunks across the first `max_papers` papers with a PDF"""
+        top_k = top_k or self.top_k
+        targets = [p for p in papers if p.get('pdf_url', '').endswith('.pdf') or p.get('source') == 'arxiv']
+        targets = targets[:max_papers]
+        # Without embeddings the chunks can't be ranked; don't download and parse PDFs for nothing
+        if not targets or not self.embedder.available():
+            return []
+
+        extracted = self.extractor.extract_many([p['pdf_url'] for p in targets])
+
+        chunk_meta = []
+        vectors = []
+        for paper, doc in zip(targets, extracted):
+            if doc.get('error') or not doc['text']:
+                continue
+            chunks = chunk_text(doc['text'], self.chunk_words, self.overlap)
+            if not chunks:
+                continue
+            vectors.append(self._chunk_vectors(doc['sha256'], chunks))
+            chunk_meta.extend({'title': paper['title'], 'text': chunk} for chunk in chunks)
+
+        if not chunk_meta:
+            return []
+
+        matrix = np.vstack(vectors).astype(np.float32)
+        index = faiss.IndexFlatIP(matrix.shape[1])
+        index.add(matrix)
+
+        query_vector = self.embedder.embed_query(query).reshape(1, -1)
+        scores, ids = index.search(query_vector, min(top_k, len(chunk_meta)))
+
+        results = []
+        for score, idx in zip(scores[0], ids[0]):
+            if idx < 0:
+                continue
+            results.append({**chunk_meta[idx], 'score': round(float(score), 3)})
+        return results
+
+    @staticmethod
+    def format_chunk(i: int, chunk: Dict) -> str:
+        """One numbered passage with its source title"""
+        return f"[{i}] From \"{chunk['title']}\":\n{chunk['text']}\n"
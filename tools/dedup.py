@@ -0,0 +1,235 @@
+"""
+Near-duplicate paper merging
+Groups papers by normalized title and MinHash/LSH signatures, merging each group into one record
+"""
+
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from tools.paper import Paper
+
+_MAX_HASH = (1 << 64) - 1
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9 ]+', ' ', (title or '').lower())).strip()
+
+
+def version_tokens(title: str) -> set:
+    """Tokens carrying digits (gpt-4, qwen2.5, 2024); titles differing in them are different papers"""
+    tokens = re.findall(r'[a-z0-9]+(?:\.[0-9]+)*', (title or '').lower())
+    return {t for t in tokens if any(c.isdigit() for c in t)}
+
+
+def arxiv_id(url: str) -> str:
+    """ArXiv identifier (without version) from an abs/pdf URL, or ''"""
+    match = re.search(r'arxiv\.org/(?:abs|pdf)/([^/?#]+?)(?:v\d+)?(?:\.pdf)?$', url or '')
+    return match.group(1) if match else ''
+
+
+def distinct_records(a: Dict, b: Dict) -> bool:
+    """Whether two records are known to be different papers regardless of their titles"""
+    id_a, id_b = arxiv_id(a.get('pdf_url')), arxiv_id(b.get('pdf_url'))
+    if id_a and id_b:
+        return id_a != id_b
+    # One source never returns the same paper twice under different links
+    return (a.get('source') == b.get('source') and bool(a.get('pdf_url')) and bool(b.get('pdf_url'))
+            and a.get('pdf_url') != b.get('pdf_url'))
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Character n-grams of a normalized title"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class PaperDeduplicator:
+    """Merge duplicate papers across sources in linear time"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.7, seed: int = 1,
+                 short_title_words: int = 6, short_threshold: float = 0.9):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # Short titles share most trigrams by construction ("X Technical Report"), so they need more
+        self.short_title_words = short_title_words
+        self.short_threshold = short_threshold
+
+        rng = np.random.RandomState(seed)
+        # Odd 64-bit multipliers for multiply-shift hashing
+        self._a = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        """MinHash signature of a shingle set"""
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingle_set), dtype=np.uint64,
+                             count=len(shingle_set))
+        # ((a*x + b) mod 2^64) >> 32, wrapping in uint64. The former (a*x + b) mod 2^61-1
+        # with a < 2^32 never wrapped for small x, so low-crc shingles won most permutations
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1)
+
+    def is_duplicate(self, a: Dict, b: Dict, shingles_a: set, shingles_b: set) -> bool:
+        """Verify an LSH candidate pair: similar titles, same version tokens, no conflicting IDs"""
+        if not shingles_a or not shingles_b:
+            return False
+        title_a, title_b = a.get('title', ''), b.get('title', '')
+        short = min(len(title_a.split()), len(title_b.split())) < self.short_title_words
+        threshold = self.short_threshold if short else self.threshold
+        if len(shingles_a & shingles_b) / len(shingles_a | shingles_b) < threshold:
+            return False
+        return version_tokens(title_a) == version_tokens(title_b) and not distinct_records(a, b)
+
+    def dedupe(self, papers: List[Dict]) -> List[Dict]:
+        """Return papers with duplicates merged, in order of first appearance"""
+        if len(papers) < 2:
+            return list(papers)
+
+        parent = list(range(len(papers)))
+        members = [[i] for i in range(len(papers))]
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i, j):
+            """Join two groups unless that would merge records known to be different papers"""
+            ri, rj = find(i), find(j)
+            if ri == rj:
+                return
+            if any(distinct_records(papers[x], papers[y]) for x in members[ri] for y in members[rj]):
+                return
+            low, high = min(ri, rj), max(ri, rj)
+            parent[high] = low
+            members[low].extend(members[high])
+
+        exact = {}
+        buckets = defaultdict(list)
+        shingle_sets = []
+        for i, paper in enumerate(papers):
+            title = normalize_title(paper.get('title', ''))
+            shingle_set = shingles(title)
+            shingle_sets.append(shingle_set)
+
+            # Same normalized title or same PDF is an exact duplicate
+            for key in (('title', title), ('url', paper.get('pdf_url'))):
+                if key[1]:
+                    if key in exact:
+                        union(exact[key], i)
+                    else:
+                        exact[key] = i
+
+            if not shingle_set:
+                continue
+            sig = self.signature(shingle_set)
+            for band in range(self.bands):
+                bucket = (band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                buckets[bucket].append(i)
+
+        # Verify LSH candidates: each member against the representative of every
+        # group already in its bucket (buckets are small, so this stays linear)
+        for candidates in buckets.values():
+            if len(candidates) < 2:
+                continue
+            representatives = [candidates[0]]
+            for other in candidates[1:]:
+                for rep in representatives:
+                    if find(rep) == find(other):
+                        break
+                    if self.is_duplicate(papers[rep], papers[other], shingle_sets[rep], shingle_sets[other]):
+                        union(rep, other)
+                        if find(rep) == find(other):
+                            break
+                else:
+                    representatives.append(other)
+
+        groups = defaultdict(list)
+        for i in range(len(papers)):
+            groups[find(i)].append(papers[i])
+
+        return [merge_papers(groups[root]) for root in sorted(groups)]
+
+
+_default = PaperDeduplicator()
+
+
+class SeenPapers:
+    """Incremental duplicate filter for papers that are emitted one at a time"""
+
+    def __init__(self, deduplicator: PaperDeduplicator = None):
+        self.deduplicator = deduplicator or _default
+        self._exact = {}  # key -> position of the paper that claimed it
+        self._buckets = defaultdict(list)
+        self._papers = []
+        self._shingles = []
+
+    def add(self, paper: Dict) -> bool:
+        """Record a paper; returns False if it duplicates one already seen"""
+        dedup = self.deduplicator
+        title = normalize_title(paper.get('title', ''))
+        keys = [key for key in (('title', title), ('url', paper.get('pdf_url'))) if key[1]]
+        for key in keys:
+            if key not in self._exact:
+                continue
+            if key[0] == 'url' or not distinct_records(self._papers[self._exact[key]], paper):
+                return False
+
+        shingle_set = shingles(title)
+        bands = []
+        if shingle_set:
+            sig = dedup.signature(shingle_set)
+            bands = [(band, sig[band * dedup.rows:(band + 1) * dedup.rows].tobytes())
+                     for band in range(dedup.bands)]
+            for bucket in bands:
+                for other in self._buckets.get(bucket, ()):
+                    if dedup.is_duplicate(self._papers[other], paper, self._shingles[other], shingle_set):
+                        return False
+
+        position = len(self._shingles)
+        self._papers.append(paper)
+        self._shingles.append(shingle_set)
+        for key in keys:
+            self._exact.setdefault(key, position)
+        for bucket in bands:
+            self._buckets[bucket].append(position)
+        return True
+
+
+def merge_papers(group: List[Dict]) -> Dict:
+    """Combine duplicate records, keeping the richest value of each field"""
+    if len(group) == 1:
+        return group[0]
+
+    first = group[0]
+    merged = first.to_dict() if isinstance(first, Paper) else dict(first)
+    arxiv = next((p for p in group if p.get('source') == 'arxiv'), None)
+
+    merged['summary'] = max((p.get('summary', '') for p in group), key=len)
+    merged['authors'] = max((p.get('authors', []) for p in group), key=len)
+    if arxiv:
+        # ArXiv carries exact dates and direct PDF links; Scholar dates default to Jan 1
+        for field in ('title', 'published', 'pdf_url', 'source'):
+            if arxiv.get(field):
+                merged[field] = arxiv[field]
+    else:
+        merged['pdf_url'] = next(
+            (p['pdf_url'] for p in group if p.get('pdf_url', '').endswith('.pdf')),
+            merged.get('pdf_url', '')
+        )
+    return Paper.from_dict(merged) if isinstance(first, Paper) else merged
+
+
+def dedupe_papers(papers: List[Dict]) -> List[Dict]:
+    """Merge near-duplicate papers with the default settings"""
+    return _default.dedupe(papers)
@@ -0,0 +1,69 @@
+"""
+Local text embeddings
+Thin wrapper over Ollama embeddings returning normalized float32 NumPy arrays
+"""
+
+import os
+import threading
+import time
+from typing import List
+
+import numpy as np
+from langchain_ollama import OllamaEmbeddings
+
+
+class Embedder:
+    """Embed texts with a local Ollama embedding model (IMARA_EMBED_MODEL, default nomic-embed-text)"""
+
+    def __init__(self, model: str = None, retry_seconds: float = 60.0):
+        self.model = model or os.environ.get("IMARA_EMBED_MODEL", "nomic-embed-text")
+        self.retry_seconds = retry_seconds
+        self._client = OllamaEmbeddings(model=self.model)
+        self._available = None
+        self._checked_at = 0.0
+
+    def available(self) -> bool:
+        """Whether the model answers; a failed probe is retried at most every `retry_seconds`"""
+        now = time.monotonic()
+        if self._available is None or (not self._available and now - self._checked_at >= self.retry_seconds):
+            try:
+                self._client.embed_query("ping")
+                self._available = True
+            except Exception as e:
+                if self._available is None:
+                    print(f"Embedding model '{self.model}' unavailable ({e}); run `ollama pull {self.model}`. "
+                          "Full-text excerpts, the routing cache and the local paper index are off until it is.")
+                self._available = False
+            self._checked_at = now
+        return self._available
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        # Unit vectors make inner product equal cosine similarity
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of documents as an (n, dim) array"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._normalize(np.asarray(self._client.embed_documents(texts), dtype=np.float32))
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query as a (dim,) array"""
+        vector = np.asarray([self._client.embed_query(text)], dtype=np.float32)
+        return self._normalize(vector)[0]
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    """Process-wide default embedder"""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = Embedder()
+    return _embedder
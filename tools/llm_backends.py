@@ -0,0 +1,132 @@
+"""
+LLM backend registry
+Builds the configured LLM (Ollama, Hugging Face pipeline, or a deterministic fake) behind one interface
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator
+
+# Every backend returns an object with invoke/stream/ainvoke/astream and model/temperature attributes
+BACKENDS: Dict[str, Callable] = {}
+
+DEFAULT_MODELS = {'ollama': 'llama3.2:3b', 'hf': 'distilgpt2', 'fake': 'fake'}
+
+
+def register_backend(name: str):
+    """Decorator adding a factory `(model, temperature, **options) -> llm` to the registry"""
+    def decorator(factory: Callable) -> Callable:
+        BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def create_llm(backend: str = None, model: str = None, temperature: float = None, **options):
+    """LLM for `backend`, defaulting to IMARA_LLM_BACKEND / IMARA_LLM_MODEL / IMARA_LLM_TEMPERATURE"""
+    backend = backend or os.environ.get("IMARA_LLM_BACKEND", "ollama")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}'; available: {', '.join(sorted(BACKENDS))}")
+    model = model or os.environ.get("IMARA_LLM_MODEL") or DEFAULT_MODELS.get(backend)
+    if temperature is None:
+        temperature = float(os.environ.get("IMARA_LLM_TEMPERATURE", "0.7"))
+    return BACKENDS[backend](model=model, temperature=temperature, **options)
+
+
+@register_backend("ollama")
+def _ollama(model: str, temperature: float, **options):
+    from langchain_ollama import OllamaLLM
+    return OllamaLLM(model=model, temperature=temperature, **options)
+
+
+class HFPipelineLLM:
+    """transformers text-generation pipeline with the LLM call interface"""
+
+    def __init__(self, model: str = "distilgpt2", temperature: float = 0.7, **pipeline_kwargs):
+        from transformers import pipeline
+        self.model = model
+        self.temperature = temperature
+        self._pipe = pipeline("text-generation", model=model, **pipeline_kwargs)
+
+    def _generate_kwargs(self, kwargs: Dict) -> Dict:
+        """Sampling settings from `temperature` (0 means greedy), overridable per call"""
+        sampling = {'do_sample': self.temperature > 0}
+        if self.temperature > 0:
+            sampling['temperature'] = self.temperature
+        return {**sampling, **kwargs}
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        return self._pipe(prompt, **self._generate_kwargs(kwargs))[0]["generated_text"]
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        # The pipeline has no incremental output; the whole text is one chunk
+        yield self.invoke(prompt, **kwargs)
+
+    async def ainvoke(self, prompt: str, **kwargs) -> str:
+        return await asyncio.to_thread(self.invoke, prompt, **kwargs)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        yield await self.ainvoke(prompt, **kwargs)
+
+
+@register_backend("hf")
+def _hf(model: str, temperature: float, **options):
+    return HFPipelineLLM(model=model, temperature=temperature, **options)
+
+
+_FAKE_WORDS = (
+    "agents", "coordinate", "policy", "reward", "graph", "attention", "retrieval", "benchmark",
+    "latency", "throughput", "model", "training", "evaluation", "dataset", "planner", "memory",
+    "tool", "reasoning", "baseline", "results", "improves", "across", "tasks", "the", "with",
+    "and", "of", "a", "multi-agent", "framework", "learning", "approach"
+)
+
+
+class FakeLLM:
+    """Deterministic stand-in with a configurable latency profile, for load tests and profiling
+
+    Output depends only on the prompt. It waits `ttft` seconds before the
+    first token and then emits `tokens_per_second`; a router prompt gets a
+    parseable score line so every pipeline stage can run without a model.
+    """
+
+    def __init__(self, model: str = "fake", temperature: float = 0.0, ttft: float = None,
+                 tokens_per_second: float = None, max_tokens: int = None):
+        self.model = model
+        self.temperature = temperature
+        self.ttft = ttft if ttft is not None else float(os.environ.get("IMARA_FAKE_TTFT", "0.2"))
+        self.tokens_per_second = tokens_per_second or float(os.environ.get("IMARA_FAKE_TOKENS_PER_SEC", "50"))
+        self.max_tokens = max_tokens or int(os.environ.get("IMARA_FAKE_MAX_TOKENS", "120"))
+
+    def _tokens(self, prompt: str) -> list:
+        rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+        if "complexity:X" in prompt:
+            scores = ' '.join(f"{key}: {rng.randint(2, 10)}" for key in ('complexity', 'code', 'literature', 'novelty'))
+            return [token + ' ' for token in scores.split()]
+        count = rng.randint(self.max_tokens // 2, self.max_tokens)
+        return [rng.choice(_FAKE_WORDS) + ' ' for _ in range(count)]
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        time.sleep(self.ttft)
+        for token in self._tokens(prompt):
+            time.sleep(1 / self.tokens_per_second)
+            yield token
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        return ''.join(self.stream(prompt))
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        await asyncio.sleep(self.ttft)
+        for token in self._tokens(prompt):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield token
+
+    async def ainvoke(self, prompt: str, **kwargs) -> str:
+        return ''.join([token async for token in self.astream(prompt)])
+
+
+@register_backend("fake")
+def _fake(model: str, temperature: float, **options):
+    return FakeLLM(model=model, temperature=temperature, **options)
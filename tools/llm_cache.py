@@ -0,0 +1,250 @@
+"""
+Persistent LLM response cache
+Wraps an LLM so identical (model, temperature, prompt) calls replay from SQLite
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from tools.prompt_budget import get_token_counter
+
+# Set for the duration of a request that must hit the model (e.g. "regenerate")
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_cache():
+    """Skip the LLM cache for every call made inside this block (thread and task local)"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def bypass_cache_for_task():
+    """Skip the LLM cache for the rest of the current asyncio task or thread
+
+    Each task runs in its own copy of the context, so this never leaks into
+    other requests; asyncio.to_thread carries it into worker threads.
+    """
+    _bypass.set(True)
+
+
+def estimate_tokens(text: str, model: str = "llama3.2:3b") -> int:
+    """Token count of a response, exact when the model's tokenizer is available locally"""
+    return get_token_counter(model).count(text)
+
+
+class LLMCache:
+    """SQLite store of LLM responses with LRU eviction"""
+
+    def __init__(self, path: str = "data/llm_cache.db", max_entries: int = 5000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                seconds REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature, prompt: str) -> str:
+        return hashlib.sha256(f"{model}|{temperature}|{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached response with its token count and original generation time"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, tokens, seconds FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return {'response': row[0], 'tokens': row[1], 'seconds': row[2]}
+
+    def put(self, key: str, model: str, response: str, tokens: int, seconds: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, tokens, seconds, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, tokens, seconds, now, now)
+            )
+            self._conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache
+                    ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+class CachedLLM:
+    """Drop-in wrapper for an LLM object: `invoke` checks the cache first
+
+    Everything else (model, temperature, ...) is forwarded to the wrapped LLM.
+    """
+
+    def __init__(self, llm, cache: LLMCache = None):
+        self.llm = llm
+        self.cache = cache or LLMCache()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.tokens_saved = 0
+        self.seconds_saved = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def _key(self, prompt: str) -> str:
+        model = getattr(self.llm, 'model', type(self.llm).__name__)
+        return LLMCache.make_key(model, getattr(self.llm, 'temperature', None), prompt)
+
+    def invoke(self, prompt: str, use_cache: bool = True, **kwargs) -> str:
+        """Return the cached response for this prompt, generating and storing it on a miss"""
+        # Only plain string prompts are cached; extra kwargs (stop words etc.) change the output
+        if not use_cache or _bypass.get() or kwargs or not isinstance(prompt, str):
+            self.bypassed += 1
+            return self.llm.invoke(prompt, **kwargs)
+
+        key = self._key(prompt)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        self.misses += 1
+        start = time.perf_counter()
+        response = self.llm.invoke(prompt)
+        self._store(key, response, time.perf_counter() - start)
+        return response
+
+    def stream(self, prompt: str, use_cache: bool = True, **kwargs) -> Iterator[str]:
+        """Stream a response; a cache hit is replayed as a single chunk"""
+        if not use_cache or _bypass.get() or kwargs or not isinstance(prompt, str):
+            self.bypassed += 1
+            yield from self.llm.stream(prompt, **kwargs)
+            return
+
+        key = self._key(prompt)
+        cached = self._lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+        self.misses += 1
+        start = time.perf_counter()
+        parts = []
+        for chunk in self.llm.stream(prompt):
+            parts.append(chunk)
+            yield chunk
+        # Only reached when the stream ran to completion, so partial responses are never cached
+        self._store(key, ''.join(parts), time.perf_counter() - start)
+
+    async def ainvoke(self, prompt: str, use_cache: bool = True, **kwargs) -> str:
+        """invoke() for the event loop; SQLite access runs in a worker thread"""
+        if not use_cache or _bypass.get() or kwargs or not isinstance(prompt, str):
+            self.bypassed += 1
+            return await self.llm.ainvoke(prompt, **kwargs)
+
+        key = self._key(prompt)
+        cached = await asyncio.to_thread(self._lookup, key)
+        if cached is not None:
+            return cached
+
+        self.misses += 1
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(prompt)
+        await asyncio.to_thread(self._store, key, response, time.perf_counter() - start)
+        return response
+
+    async def astream(self, prompt: str, use_cache: bool = True, **kwargs) -> AsyncIterator[str]:
+        """stream() for the event loop"""
+        if not use_cache or _bypass.get() or kwargs or not isinstance(prompt, str):
+            self.bypassed += 1
+            async for chunk in self.llm.astream(prompt, **kwargs):
+                yield chunk
+            return
+
+        key = self._key(prompt)
+        cached = await asyncio.to_thread(self._lookup, key)
+        if cached is not None:
+            yield cached
+            return
+
+        self.misses += 1
+        start = time.perf_counter()
+        parts = []
+        async for chunk in self.llm.astream(prompt):
+            parts.append(chunk)
+            yield chunk
+        # Only reached when the stream ran to completion, so partial responses are never cached
+        await asyncio.to_thread(self._store, key, ''.join(parts), time.perf_counter() - start)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Cached response text, counting the hit; None on a miss or read error"""
+        try:
+            cached = self.cache.get(key)
+        except sqlite3.Error as e:
+            print(f"LLM cache read error: {e}")
+            return None
+        if cached is None:
+            return None
+        self.hits += 1
+        self.tokens_saved += cached['tokens']
+        self.seconds_saved += cached['seconds']
+        return cached['response']
+
+    def _store(self, key: str, response: str, seconds: float):
+        try:
+            model = getattr(self.llm, 'model', '')
+            self.cache.put(key, model, response, estimate_tokens(response, model or "llama3.2:3b"), seconds)
+        except sqlite3.Error as e:
+            print(f"LLM cache write error: {e}")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and what the hits saved"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'tokens_saved': self.tokens_saved,
+            'seconds_saved': round(self.seconds_saved, 2),
+            'entries': self.cache.size(),
+            'max_entries': self.cache.max_entries
+        }
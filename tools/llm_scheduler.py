@@ -0,0 +1,168 @@
+"""
+LLM request scheduler
+Admits generations to the shared LLM through a priority queue with a max-in-flight limit
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict
+
+from tools.metrics_aggregates import RunningStats
+
+# Lower runs first: quick routing calls jump ahead of long generations
+PRIORITY_ROUTER = 0
+PRIORITY_RESEARCH = 1
+PRIORITY_REVIEW = 2
+PRIORITY_CODE = 3
+DEFAULT_PRIORITY = PRIORITY_RESEARCH
+
+_PRIORITY_NAMES = {PRIORITY_ROUTER: 'router', PRIORITY_RESEARCH: 'research',
+                   PRIORITY_REVIEW: 'review', PRIORITY_CODE: 'code'}
+
+_priority = contextvars.ContextVar("llm_priority", default=DEFAULT_PRIORITY)
+
+
+@contextmanager
+def llm_priority(level: int):
+    """Schedule every LLM call made inside this block at `level` (task and thread local)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LLMScheduler:
+    """Wraps an LLM so at most `max_in_flight` generations run at once
+
+    Waiting calls are admitted lowest priority value first, FIFO within a level.
+    Cancelling a waiting or streaming call (e.g. when its websocket goes away)
+    frees its place immediately. Sync calls from worker threads are routed
+    through the event loop once one is attached; without a loop they pass through.
+    """
+
+    def __init__(self, llm, max_in_flight: int = None):
+        self.llm = llm
+        self.max_in_flight = max_in_flight or int(os.environ.get("IMARA_LLM_MAX_IN_FLIGHT", "2"))
+
+        self.in_flight = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self._waiting = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._loop = None
+        self._wait_stats: Dict[int, RunningStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def attach(self, loop: asyncio.AbstractEventLoop = None):
+        """Bind to the serving event loop so worker-thread calls are scheduled too"""
+        self._loop = loop or asyncio.get_running_loop()
+
+    def _record_wait(self, priority: int, seconds: float):
+        with self._stats_lock:
+            self._wait_stats.setdefault(priority, RunningStats()).add(seconds)
+
+    async def _acquire(self, priority: int):
+        if self._loop is None:
+            self.attach()
+        start = time.perf_counter()
+        if self.in_flight < self.max_in_flight and not self._waiting:
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (priority, next(self._seq), future))
+            try:
+                await future  # _release hands over the slot by resolving this
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release()  # slot was handed over just as we were cancelled
+                self.cancelled += 1
+                raise
+        self._record_wait(priority, time.perf_counter() - start)
+
+    def _release(self):
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)  # in_flight stays the same: the slot moves over
+                return
+        self.in_flight -= 1
+
+    async def ainvoke(self, prompt, priority: int = None, **kwargs) -> str:
+        priority = _priority.get() if priority is None else priority
+        await self._acquire(priority)
+        try:
+            response = await self.llm.ainvoke(prompt, **kwargs)
+            self.completed += 1
+            return response
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._release()
+
+    async def astream(self, prompt, priority: int = None, **kwargs) -> AsyncIterator[str]:
+        """The slot is held for the whole stream and released if the consumer stops early"""
+        priority = _priority.get() if priority is None else priority
+        await self._acquire(priority)
+        try:
+            async for chunk in self.llm.astream(prompt, **kwargs):
+                yield chunk
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._release()
+
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def invoke(self, prompt, priority: int = None, **kwargs) -> str:
+        """Sync call for worker threads; waits its turn on the attached event loop
+
+        The scheduled call is not tied to the caller's task, so cancelling that task
+        does not cancel it; request paths that must stop on disconnect use ainvoke.
+        """
+        if self._loop is None or self._loop.is_closed() or self._on_loop_thread():
+            return self.llm.invoke(prompt, **kwargs)
+        priority = _priority.get() if priority is None else priority
+        future = asyncio.run_coroutine_threadsafe(self.ainvoke(prompt, priority, **kwargs), self._loop)
+        return future.result()
+
+    def stream(self, prompt, **kwargs):
+        # Sync streaming is only used outside the API, where there is nothing to schedule against
+        return self.llm.stream(prompt, **kwargs)
+
+    def stats(self) -> Dict:
+        """Concurrency, queue depth and queue-wait distribution per priority"""
+        with self._stats_lock:
+            waits = {_PRIORITY_NAMES.get(p, str(p)): s.summary() for p, s in sorted(self._wait_stats.items())}
+        return {
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self.in_flight,
+            'queued': sum(1 for _, _, f in self._waiting if not f.done()),
+            'completed': self.completed,
+            'cancelled': self.cancelled,
+            'failed': self.failed,
+            'queue_wait_seconds': waits
+        }
@@ -0,0 +1,35 @@
+"""
+Streaming LLM generation
+Runs a prompt through the LLM's streaming interface, forwarding chunks as they arrive
+"""
+
+import inspect
+from typing import Callable, Optional
+
+
+def generate(llm, prompt: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """Full response text; with `on_token`, each chunk is passed on as it is generated"""
+    if on_token is None or not hasattr(llm, 'stream'):
+        return llm.invoke(prompt)
+
+    parts = []
+    for chunk in llm.stream(prompt):
+        if chunk:
+            parts.append(chunk)
+            on_token(chunk)
+    return ''.join(parts)
+
+
+async def agenerate(llm, prompt: str, on_token: Optional[Callable] = None) -> str:
+    """Async generate(); `on_token` may be a plain function or a coroutine function"""
+    if on_token is None or not hasattr(llm, 'astream'):
+        return await llm.ainvoke(prompt)
+
+    parts = []
+    async for chunk in llm.astream(prompt):
+        if chunk:
+            parts.append(chunk)
+            outcome = on_token(chunk)
+            if inspect.isawaitable(outcome):
+                await outcome
+    return ''.join(parts)
@@ -5,15 +5,22 @@ Tracks and scores research quality across multiple dimensions
 
 from datetime import datetime
 from typing import Dict, List
-import json
-from pathlib import Path
+import numpy as np
+from tools.paper import paper_year
+from tools.metrics_store import MetricsStore
+from tools.metrics_writer import MetricsWriter, get_metrics_writer
 
 class ResearchMetrics:
     """Track and analyze research quality metrics"""
     
-    def __init__(self):
-        self.metrics_file = Path("data/metrics.json")
-        self.metrics_file.parent.mkdir(exist_ok=True)
+    def __init__(self, store: MetricsStore = None, writer: MetricsWriter = None,
+                 background: bool = True):
+        # Default: records go through the shared background writer, off the request path
+        if background and writer is None and store is None:
+            writer = get_metrics_writer()
+        self.writer = writer
+        self.store = writer.store if writer else (store or MetricsStore())
+        self.metrics_file = self.store.path
     
     def calculate_paper_quality(self, papers: List[Dict]) -> Dict:
         """Calculate quality score for retrieved papers"""
@@ -38,17 +45,85 @@ class ResearchMetrics:
             'timestamp': datetime.now().isoformat()
         }
     
+    def calculate_batch(self, paper_lists: List[List[Dict]], current_year: int = None) -> List[Dict]:
+        """Score many result sets at once; identical to calling calculate_paper_quality on each
+        
+        Per-paper features are gathered in one pass and the four sub-scores are
+        computed over flat NumPy arrays, grouped back per result set with bincount
+        (which sums in input order, matching the scalar path bit for bit).
+        """
+        current_year = current_year or datetime.now().year
+        timestamp = datetime.now().isoformat()
+        
+        valid = [i for i, papers in enumerate(paper_lists) if papers and 'error' not in papers[0]]
+        results = [{'score': 0, 'grade': 'F', 'issues': ['No papers found']} for _ in paper_lists]
+        if not valid:
+            return results
+        
+        group, years, author_counts, summary_lengths, unique_words = [], [], [], [], []
+        for g, i in enumerate(valid):
+            papers = paper_lists[i]
+            for paper in papers:
+                group.append(g)
+                years.append(paper_year(paper))
+                author_counts.append(len(paper.get('authors', [])))
+                summary_lengths.append(len(paper.get('summary', '')))
+            titles = [p.get('title', '') for p in papers]
+            unique_words.append(len(set(' '.join(titles).lower().split())))
+        
+        group = np.asarray(group)
+        counts = np.bincount(group).astype(float)
+        
+        # Recency: same piecewise table as _score_recency
+        age = current_year - np.asarray(years, dtype=float)
+        paper_recency = np.select(
+            [age == 0, age == 1, age == 2, age == 3],
+            [10.0, 9.0, 7.0, 5.0],
+            default=np.maximum(1, 10 - age * 1.5)
+        )
+        recency = np.minimum(np.bincount(group, weights=paper_recency) / counts, 10)
+        
+        # Relevance: mean summary length against a 500-character target
+        mean_length = np.bincount(group, weights=np.asarray(summary_lengths, dtype=float)) / counts
+        relevance = np.minimum(mean_length / 500, 1.0) * 10
+        
+        # Citation potential: author-count bands from _score_authors
+        authors = np.asarray(author_counts)
+        paper_authors = np.select(
+            [(authors >= 3) & (authors <= 6), (authors >= 2) & (authors <= 8), authors >= 9],
+            [10.0, 8.0, 7.0],
+            default=6.0
+        )
+        citation = np.minimum(np.bincount(group, weights=paper_authors) / counts, 10)
+        
+        diversity = np.minimum(np.asarray(unique_words, dtype=float) / 50, 1.0) * 10
+        
+        for g, i in enumerate(valid):
+            # Python round() on each value keeps rounding identical to the scalar path
+            scores = {
+                'recency': round(float(recency[g]), 1),
+                'relevance': round(float(relevance[g]), 1),
+                'citation_potential': round(float(citation[g]), 1),
+                'diversity': round(float(diversity[g]), 1)
+            }
+            overall = sum(scores.values()) / len(scores)
+            results[i] = {
+                'overall_score': round(overall, 2),
+                'grade': self._assign_grade(overall),
+                'breakdown': scores,
+                'paper_count': int(counts[g]),
+                'timestamp': timestamp
+            }
+        
+        return results
+    
     def _score_recency(self, papers: List[Dict]) -> float:
         """Score based on publication dates (newer = better) with exponential weighting"""
         current_year = datetime.now().year
         years = []
     
         for paper in papers:
-            try:
-                year = int(paper.get('published', '2020')[:4])
-                years.append(year)
-            except:
-                years.append(2020)
+            years.append(paper_year(paper))
     
         # Exponential weighting: 2025 papers get 10/10, 2024 get 8/10, 2023 get 6/10, etc.
         scores = []
@@ -128,12 +203,14 @@ class ResearchMetrics:
         }
         
         # Append to metrics log
-        existing = []
-        if self.metrics_file.exists():
-            with open(self.metrics_file, 'r') as f:
-                existing = json.load(f)
-        
-        existing.append(data)
+        if self.writer:
+            self.writer.submit(data)
+        else:
+            self.store.append(data)
+    
+    def iter_history(self):
+        """Lazily iterate saved metrics records, oldest first
         
-        with open(self.metrics_file, 'w') as f:
-            json.dump(existing, f, indent=2)
+        Records still queued in the background writer appear after `writer.flush()`.
+        """
+        return self.store.iter_history()
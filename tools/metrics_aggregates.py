@@ -0,0 +1,361 @@
+"""
+Rolling metrics aggregates
+Incrementally maintained per-day and per-query-cluster statistics with streaming percentiles
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from tools.metrics_store import MetricsStore
+
+DIMENSIONS = ('overall_score', 'recency', 'relevance', 'citation_potential', 'diversity')
+
+_CLUSTER_STOPWORDS = {'a', 'an', 'and', 'for', 'in', 'of', 'on', 'the', 'to', 'with', 'systems', 'system'}
+
+
+def query_cluster(query: str) -> str:
+    """Lexical cluster key: casing, punctuation, word order and plurals don't matter"""
+    words = re.findall(r'[a-z0-9]+', query.lower())
+    stems = {w[:-1] if len(w) > 3 and w.endswith('s') else w for w in words}
+    return ' '.join(sorted(stems - _CLUSTER_STOPWORDS)) or query.strip().lower()
+
+
+class TDigest:
+    """Merging t-digest for streaming quantiles in bounded memory"""
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[float] = []
+
+    def add(self, value: float):
+        value = float(value)
+        self._buffer.append(value)
+        self.total += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 2 * self.compression:
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + [(x, 1) for x in self._buffer])
+        self._buffer = []
+
+        # k1 scale function: centroids may be large mid-distribution but stay small in the tails
+        def k(q):
+            return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+        def k_inverse(value):
+            return (math.sin(value * 2 * math.pi / self.compression) + 1) / 2
+
+        means, weights = [], []
+        cumulative = 0.0
+        mean, weight = points[0]
+        q_limit = k_inverse(k(0.0) + 1)
+        for m, w in points[1:]:
+            if (cumulative + weight + w) / self.total <= q_limit:
+                weight += w
+                mean += (m - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                cumulative += weight
+                q_limit = k_inverse(k(min(cumulative / self.total, 1.0)) + 1)
+                mean, weight = m, w
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0..1), or None when empty"""
+        self._compress()
+        if not self.means:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+
+        target = q * self.total
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0.0
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+
+        span = self.total - previous_center
+        fraction = (target - previous_center) / span if span else 1.0
+        return previous_mean + fraction * (self.max - previous_mean)
+
+    def to_dict(self) -> Dict:
+        self._compress()
+        return {'compression': self.compression, 'means': self.means, 'weights': self.weights,
+                'total': self.total, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TDigest':
+        digest = cls(data.get('compression', 100))
+        digest.means = data['means']
+        digest.weights = data['weights']
+        digest.total = data['total']
+        digest.min = data['min']
+        digest.max = data['max']
+        return digest
+
+
+class RunningStats:
+    """Count, mean, variance (Welford) and a t-digest for one dimension"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.digest = TDigest()
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.digest.add(value)
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {'count': 0}
+        q = self.digest.quantile
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 3),
+            'std': round(math.sqrt(self.m2 / self.count), 3),
+            'min': self.digest.min,
+            'max': self.digest.max,
+            'p50': round(q(0.5), 3),
+            'p90': round(q(0.9), 3),
+            'p99': round(q(0.99), 3)
+        }
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'digest': self.digest.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStats':
+        stats = cls()
+        stats.count = data['count']
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        stats.digest = TDigest.from_dict(data['digest'])
+        return stats
+
+
+def _new_group() -> Dict:
+    return {'count': 0, 'failed': 0, 'last_query': '', 'stats': {d: RunningStats() for d in DIMENSIONS}}
+
+
+class MetricsAggregates:
+    """O(1)-per-record aggregates over the metrics log, snapshotted to disk
+
+    The snapshot remembers how far into the log it has read, so refresh() only
+    folds in records appended since, and every process reading the same log
+    converges on the same snapshot.
+    """
+
+    def __init__(self, store: MetricsStore = None, path: str = "data/metrics_summary.json",
+                 max_days: int = 365, max_clusters: int = 500):
+        self.store = store or MetricsStore()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_days = max_days
+        self.max_clusters = max_clusters
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # one reader of the log at a time
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.records = 0
+        self.log_offset = 0
+        self.log_inode = None
+        self.overall = _new_group()
+        self.by_day: Dict[str, Dict] = {}
+        self.by_cluster: Dict[str, Dict] = {}
+
+    def refresh(self) -> int:
+        """Fold in records appended to the log since the last refresh; returns how many"""
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        log = self.store.path
+        if not log.exists():
+            return 0
+
+        stat = os.stat(log)
+        with self._lock:
+            # Compaction rewrites the log, which invalidates the saved offset
+            if (self.log_inode is not None and stat.st_ino != self.log_inode) or stat.st_size < self.log_offset:
+                self._reset()
+            if stat.st_size == self.log_offset:
+                return 0
+            offset = self.log_offset
+
+        added = 0
+        with open(log, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # record still being written; pick it up next time
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                try:
+                    self.update(record)
+                except Exception as e:
+                    print(f"Skipping metrics record: {e}")
+                # Advance per record so a failure never replays (and double-counts) earlier ones
+                with self._lock:
+                    self.log_offset = offset
+                added += 1
+
+        with self._lock:
+            self.log_offset = offset
+            self.log_inode = stat.st_ino
+        if added:
+            self.save()
+        return added
+
+    def _update_group(self, group: Dict, query: str, metrics: Dict):
+        group['count'] += 1
+        group['last_query'] = query
+        if 'overall_score' not in metrics:
+            group['failed'] += 1
+            return
+        group['stats']['overall_score'].add(metrics['overall_score'])
+        for dimension, value in metrics.get('breakdown', {}).items():
+            if dimension in group['stats']:
+                group['stats'][dimension].add(value)
+
+    def update(self, record: Dict):
+        """Fold one metrics-log record into every aggregate it belongs to"""
+        query = record.get('query', '')
+        metrics = record.get('metrics', {})
+        day = record.get('timestamp', '')[:10]
+        cluster = query_cluster(query)
+
+        with self._lock:
+            self.records += 1
+            self._update_group(self.overall, query, metrics)
+
+            # Undated records and days older than a full window only count overall
+            if day and (day in self.by_day or len(self.by_day) < self.max_days or day > min(self.by_day)):
+                if day not in self.by_day:
+                    self.by_day[day] = _new_group()
+                    if len(self.by_day) > self.max_days:
+                        del self.by_day[min(self.by_day)]
+                self._update_group(self.by_day[day], query, metrics)
+
+            # Re-insert so dict order tracks recency; the oldest cluster is evicted first
+            group = self.by_cluster.pop(cluster, None) or _new_group()
+            self.by_cluster[cluster] = group
+            if len(self.by_cluster) > self.max_clusters:
+                del self.by_cluster[next(iter(self.by_cluster))]
+            self._update_group(group, query, metrics)
+
+    def update_many(self, records: Iterable[Dict]):
+        for record in records:
+            self.update(record)
+
+    @staticmethod
+    def _group_summary(group: Dict) -> Dict:
+        return {
+            'count': group['count'],
+            'failed': group['failed'],
+            'last_query': group['last_query'],
+            **{d: s.summary() for d, s in group['stats'].items()}
+        }
+
+    def summary(self, days: int = 30, top_clusters: int = 20) -> Dict:
+        """Dashboard view: overall stats, the last `days` days and the busiest clusters"""
+        self.refresh()
+        with self._lock:
+            recent_days = sorted(self.by_day)[-days:]
+            clusters = sorted(self.by_cluster.items(), key=lambda item: item[1]['count'],
+                              reverse=True)[:top_clusters]
+            return {
+                'records': self.records,
+                'overall': self._group_summary(self.overall),
+                'by_day': [{'day': day, **self._group_summary(self.by_day[day])} for day in recent_days],
+                'clusters': [{'cluster': key, **self._group_summary(group)} for key, group in clusters]
+            }
+
+    @staticmethod
+    def _dump_group(group: Dict) -> Dict:
+        return {**group, 'stats': {d: s.to_dict() for d, s in group['stats'].items()}}
+
+    @staticmethod
+    def _load_group(data: Dict) -> Dict:
+        return {**data, 'stats': {d: RunningStats.from_dict(s) for d, s in data['stats'].items()}}
+
+    def save(self):
+        """Atomically write the snapshot; its size is independent of history length"""
+        with self._lock:
+            snapshot = {
+                'records': self.records,
+                'log_offset': self.log_offset,
+                'log_inode': self.log_inode,
+                'overall': self._dump_group(self.overall),
+                'by_day': {k: self._dump_group(g) for k, g in self.by_day.items()},
+                'by_cluster': {k: self._dump_group(g) for k, g in self.by_cluster.items()}
+            }
+        tmp = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.path)
+
+    def _load(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                snapshot = json.load(f)
+            self.records = snapshot['records']
+            self.log_offset = snapshot['log_offset']
+            self.log_inode = snapshot['log_inode']
+            self.overall = self._load_group(snapshot['overall'])
+            self.by_day = {k: self._load_group(g) for k, g in snapshot['by_day'].items()}
+            self.by_cluster = {k: self._load_group(g) for k, g in snapshot['by_cluster'].items()}
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Metrics summary snapshot unreadable, rebuilding: {e}")
+            self._reset()
+            return False
+
+
+_aggregates = None
+_aggregates_lock = threading.Lock()
+
+
+def get_metrics_aggregates() -> MetricsAggregates:
+    """Process-wide aggregates over the default metrics log"""
+    global _aggregates
+    with _aggregates_lock:
+        if _aggregates is None:
+            _aggregates = MetricsAggregates()
+    return _aggregates
@@ -0,0 +1,130 @@
+"""
+Append-only metrics log
+JSONL store for research metrics with atomic appends, lazy history reads and compaction
+"""
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: appends are still serialized within the process
+    FCNTL_AVAILABLE = False
+
+
+class MetricsStore:
+    """One JSON record per line; writers only ever append"""
+
+    def __init__(self, path: str = "data/metrics.jsonl", legacy_path: str = "data/metrics.json",
+                 compact_every: int = 1000, max_records: int = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self.compact_every = compact_every
+        self.max_records = max_records
+
+        self._lock = threading.Lock()
+        self._appends_since_compact = 0
+        self.migrate_legacy()
+
+    def _locked_file(self, mode: str):
+        """Open the log with an exclusive cross-process lock where supported"""
+        while True:
+            f = open(self.path, mode)
+            if not FCNTL_AVAILABLE:
+                return f
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            # Another process may have compacted (replaced) the file while we waited
+            if os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino:
+                return f
+            f.close()
+
+    def append(self, record: Dict):
+        """Append one record"""
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict]):
+        """Append records with a single write so concurrent writers never interleave"""
+        if not records:
+            return
+        payload = ''.join(json.dumps(r) + "\n" for r in records)
+
+        with self._lock:
+            with self._locked_file('a') as f:
+                f.write(payload)
+                f.flush()
+            self._appends_since_compact += len(records)
+            due = self.compact_every and self._appends_since_compact >= self.compact_every
+
+        if due:
+            self.compact()
+
+    def iter_history(self) -> Iterator[Dict]:
+        """Lazily yield records oldest first, skipping torn or corrupt lines"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def compact(self):
+        """Rewrite the log without corrupt lines, keeping the newest `max_records`"""
+        with self._lock:
+            with self._locked_file('a+') as f:
+                f.seek(0)
+                lines = []
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        continue
+                    lines.append(line)
+                if self.max_records:
+                    lines = lines[-self.max_records:]
+
+                tmp = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+                with open(tmp, 'w') as out:
+                    out.write(''.join(line + "\n" for line in lines))
+                # Swap while still holding the lock on the old file
+                os.replace(tmp, self.path)
+            self._appends_since_compact = 0
+
+    def migrate_legacy(self) -> int:
+        """One-shot import of the old JSON-array metrics file; returns records migrated"""
+        if not self.legacy_path or not self.legacy_path.exists():
+            return 0
+
+        with self._lock:
+            if not self.legacy_path.exists():
+                return 0
+            try:
+                with open(self.legacy_path, 'r') as f:
+                    legacy = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Metrics migration skipped: {e}")
+                return 0
+
+            # Legacy records are older than anything already in the log
+            existing = self.path.read_text() if self.path.exists() else ''
+            tmp = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+            with open(tmp, 'w') as out:
+                out.write(''.join(json.dumps(r) + "\n" for r in legacy))
+                out.write(existing)
+            os.replace(tmp, self.path)
+            os.replace(self.legacy_path, self.legacy_path.with_name(self.legacy_path.name + ".migrated"))
+
+        return len(legacy)
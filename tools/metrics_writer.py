@@ -0,0 +1,133 @@
+"""
+Background metrics writer
+Batches metrics records off the request path through a bounded queue and a writer thread
+"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Dict
+
+from tools.metrics_store import MetricsStore
+
+_STOP = object()
+_FLUSH = object()
+
+
+class MetricsWriter:
+    """Queue records and persist them in batches on a background thread"""
+
+    def __init__(self, store: MetricsStore = None, max_queue: int = 1000, batch_size: int = 50,
+                 flush_interval: float = 1.0):
+        self.store = store or MetricsStore()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.lost = 0  # records in batches the store failed to write
+        self._accepted = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict) -> bool:
+        """Enqueue a record without blocking; returns False if it was dropped"""
+        if self._closed:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+            self._accepted += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        batch = []
+        deadline = None
+        stopping = False
+
+        while not stopping:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            forced = False
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is _STOP:
+                    stopping = True
+                elif item is _FLUSH:
+                    forced = True
+                else:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            # Flush on size, on the time limit, or when asked to
+            if batch and (stopping or forced or len(batch) >= self.batch_size
+                          or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+                deadline = None
+
+    def _write(self, batch: list):
+        try:
+            self.store.append_many(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.lost += len(batch)
+            print(f"Metrics writer error ({len(batch)} records lost): {e}")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything accepted so far has been written (or lost)"""
+        target = self._accepted
+        end = time.monotonic() + timeout
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        while self.written + self.lost < target and time.monotonic() < end:
+            time.sleep(0.005)
+        return self.written + self.lost >= target
+
+    def close(self, timeout: float = 5.0):
+        """Stop accepting records and drain the queue to disk"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("Metrics writer: queue still full at shutdown, unwritten records may be lost")
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """Queue depth and write/drop counters"""
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'lost': self.lost
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_metrics_writer() -> MetricsWriter:
+    """Process-wide writer, drained automatically at interpreter exit"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = MetricsWriter()
+            atexit.register(_writer.close)
+    return _writer
@@ -0,0 +1,83 @@
+"""
+Paper record type
+Compact, slotted paper record shared by search, scoring, formatting and the API
+"""
+
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+FIELDS = ('title', 'authors', 'summary', 'pdf_url', 'published', 'source')
+
+
+def _parse_year(published: str) -> Optional[int]:
+    try:
+        return int(published[:4])
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True)
+class Paper:
+    """One search result; serializes to the existing paper dict shape"""
+
+    title: str
+    authors: Tuple[str, ...] = ()
+    summary: str = ''
+    pdf_url: str = ''
+    published: str = ''
+    source: str = ''
+    # Parsed once here so scorers don't re-slice `published`
+    year: Optional[int] = field(default=None, compare=False)
+
+    def __post_init__(self):
+        # Source tags and author names repeat across thousands of cached papers
+        self.source = sys.intern(self.source)
+        self.authors = tuple(sys.intern(a) for a in self.authors)
+        self.year = _parse_year(self.published)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Paper':
+        """Build from a paper dict (search cache, indexes, metrics history)"""
+        if isinstance(data, Paper):
+            return data
+        authors = data.get('authors', ())
+        if isinstance(authors, str):
+            authors = (authors,)
+        return cls(
+            title=data.get('title', 'Unknown'),
+            authors=tuple(authors),
+            summary=data.get('summary', ''),
+            pdf_url=data.get('pdf_url', ''),
+            published=data.get('published', ''),
+            source=data.get('source', '')
+        )
+
+    def to_dict(self) -> Dict:
+        """Serialize to the JSON shape used before Paper existed"""
+        return {
+            'title': self.title,
+            'authors': list(self.authors),
+            'summary': self.summary,
+            'pdf_url': self.pdf_url,
+            'published': self.published,
+            'source': self.source
+        }
+
+    # Read-only mapping access so code written against paper dicts keeps working
+    def __getitem__(self, key: str):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELDS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in FIELDS else default
+
+
+def paper_year(paper, default: int = 2020) -> int:
+    """Publication year of a Paper or paper dict"""
+    year = paper.year if isinstance(paper, Paper) else _parse_year(paper.get('published', ''))
+    return default if year is None else year
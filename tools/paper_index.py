@@ -0,0 +1,193 @@
+"""
+Local semantic paper index
+Persistent FAISS index over title + abstract of every paper the search tool has returned
+"""
+
+import atexit
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from tools.embeddings import Embedder, get_embedder
+from tools.paper import Paper
+from tools.search_cache import normalize_query
+
+
+def paper_key(paper: Dict) -> str:
+    """Stable identity for a paper across searches"""
+    return paper.get('pdf_url') or normalize_query(paper.get('title', ''))
+
+
+class PaperIndex:
+    """Incrementally updated, disk-persisted vector index of known papers
+
+    New vectors are appended to a sidecar file (vectors.bin: int32 dim, then
+    int64 id + float32 vector per record); the full FAISS index is only
+    rewritten every `checkpoint_every` papers and at shutdown.
+    """
+
+    def __init__(self, root: str = "data/paper_index", embedder: Embedder = None,
+                 checkpoint_every: int = 500):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.root / "index.faiss"
+        self.papers_file = self.root / "papers.jsonl"
+        self.vectors_file = self.root / "vectors.bin"
+        self.embedder = embedder or get_embedder()
+        self.checkpoint_every = checkpoint_every
+
+        self._lock = threading.Lock()
+        self._papers = {}  # id -> paper
+        self._keys = {}    # key -> id
+        self._index = None
+        self._pending = 0  # vectors in the sidecar but not in index.faiss
+        self._load()
+
+    def _load(self):
+        if self.papers_file.exists():
+            with open(self.papers_file, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from an interrupted append
+                    self._papers[record['id']] = Paper.from_dict(record['paper'])
+                    self._keys[record['key']] = record['id']
+
+        if self.index_file.exists():
+            self._index = faiss.read_index(str(self.index_file))
+        self._replay_sidecar()
+
+        # Drop metadata for vectors that never made it to disk
+        stored_count = self._index.ntotal if self._index is not None else 0
+        if stored_count != len(self._papers):
+            stored = set(faiss.vector_to_array(self._index.id_map).tolist()) if self._index is not None else set()
+            self._papers = {i: p for i, p in self._papers.items() if i in stored}
+            self._keys = {k: i for k, i in self._keys.items() if i in stored}
+
+    def _replay_sidecar(self):
+        """Add vectors appended since the last checkpoint; a torn final record is ignored"""
+        if not self.vectors_file.exists():
+            return
+        data = self.vectors_file.read_bytes()
+        if len(data) < 4:
+            return
+        dim = int(np.frombuffer(data[:4], dtype=np.int32)[0])
+        record = np.dtype([('id', np.int64), ('vector', np.float32, (dim,))])
+        count = (len(data) - 4) // record.itemsize
+        records = np.frombuffer(data[4:4 + count * record.itemsize], dtype=record)
+        if self._index is None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        # Records already in the index survive a crash between checkpoint and truncation
+        stored = set(faiss.vector_to_array(self._index.id_map).tolist())
+        fresh = np.array([i not in stored for i in records['id'].tolist()], dtype=bool)
+        if fresh.any():
+            self._index.add_with_ids(np.ascontiguousarray(records['vector'][fresh]),
+                                     np.ascontiguousarray(records['id'][fresh]))
+        self._pending = int(fresh.sum())
+
+    def _append_sidecar(self, ids: np.ndarray, vectors: np.ndarray):
+        new_file = not self.vectors_file.exists() or self.vectors_file.stat().st_size == 0
+        with open(self.vectors_file, 'ab') as f:
+            if new_file:
+                f.write(np.int32(vectors.shape[1]).tobytes())
+            record = np.dtype([('id', np.int64), ('vector', np.float32, (vectors.shape[1],))])
+            rows = np.empty(len(ids), dtype=record)
+            rows['id'] = ids
+            rows['vector'] = vectors
+            f.write(rows.tobytes())
+
+    def checkpoint(self):
+        """Write the full index and empty the sidecar"""
+        with self._lock:
+            if self._index is None or not self._pending:
+                return
+            tmp = self.root / f".index.{uuid.uuid4().hex}.tmp"
+            faiss.write_index(self._index, str(tmp))
+            os.replace(tmp, self.index_file)
+            self.vectors_file.unlink(missing_ok=True)
+            self._pending = 0
+
+    def __len__(self) -> int:
+        return len(self._papers)
+
+    def add(self, papers: List[Dict]) -> int:
+        """Embed and add papers not yet indexed; returns how many were added"""
+        with self._lock:
+            new = []
+            seen = set()
+            for paper in papers:
+                key = paper_key(paper)
+                if key and key not in self._keys and key not in seen:
+                    seen.add(key)
+                    new.append((key, Paper.from_dict(paper)))
+        if not new or not self.embedder.available():
+            return 0
+
+        vectors = self.embedder.embed(
+            [f"{paper.get('title', '')}. {paper.get('summary', '')}" for _, paper in new]
+        )
+
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+
+            start_id = max(self._papers, default=-1) + 1
+            ids = np.arange(start_id, start_id + len(new), dtype=np.int64)
+            self._index.add_with_ids(vectors, ids)
+
+            with open(self.papers_file, 'a') as f:
+                for paper_id, (key, paper) in zip(ids.tolist(), new):
+                    self._papers[paper_id] = paper
+                    self._keys[key] = paper_id
+                    f.write(json.dumps({'id': paper_id, 'key': key, 'paper': paper.to_dict()}) + "\n")
+
+            # Metadata first: on reload, papers without a vector are dropped, never the reverse
+            self._append_sidecar(ids, vectors)
+            self._pending += len(new)
+            checkpoint_due = self._pending >= self.checkpoint_every
+
+        if checkpoint_due:
+            self.checkpoint()
+        return len(new)
+
+    def search(self, query: str, k: int = 7, min_score: float = 0.0) -> List[tuple]:
+        """Nearest papers as (score, paper) pairs, best first"""
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return []
+        if not self.embedder.available():
+            return []
+
+        query_vector = self.embedder.embed_query(query).reshape(1, -1)
+
+        with self._lock:
+            scores, ids = self._index.search(query_vector, min(k, self._index.ntotal))
+            return [
+                (round(float(score), 3), self._papers[int(paper_id)])
+                for score, paper_id in zip(scores[0], ids[0])
+                if paper_id >= 0 and score >= min_score
+            ]
+
+
+_paper_index = None
+_paper_index_lock = threading.Lock()
+
+
+def get_paper_index() -> PaperIndex:
+    """Process-wide paper index, loaded from disk on first use"""
+    global _paper_index
+    with _paper_index_lock:
+        if _paper_index is None:
+            _paper_index = PaperIndex()
+            atexit.register(_paper_index.checkpoint)
+    return _paper_index
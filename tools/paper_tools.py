@@ -1,9 +1,18 @@
 import arxiv
-import requests
+import re
 from pathlib import Path
-import PyPDF2
-from io import BytesIO
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import os
+import queue
+import time
+from tools.search_cache import SearchCache
+from tools.pdf_store import PDFStore
+from tools.pdf_extract import PDFExtractor
+from tools.paper_index import PaperIndex, get_paper_index
+from tools.bm25_index import BM25Index, get_bm25_index
+from tools.dedup import dedupe_papers, SeenPapers
+from tools.paper import Paper, paper_year
 
 try:
     from scholarly import scholarly
@@ -12,68 +21,380 @@ except ImportError:
     SCHOLARLY_AVAILABLE = False
     print("Warning: scholarly not installed. Google Scholar search disabled.")
 
+# Shared pool for source fan-out. A source that overruns its deadline keeps its
+# worker until it returns, so the pool is module-level rather than per call
+# (a `with` block would wait for the straggler and defeat the deadline).
+# Each session, job and extra search angle runs up to three sources at once,
+# plus stragglers; the threads only wait on the network, so size generously.
+_SOURCE_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("IMARA_SEARCH_WORKERS", "32")),
+                                  thread_name_prefix="paper-source")
+
+# Background indexing (embeddings + FAISS writes) gets its own small pool so it
+# can never hold source workers and push ArXiv past its deadline
+_INDEX_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="paper-index")
+
 
 class PaperSearchTool:
     """Search and download academic papers from multiple sources"""
     
-    def __init__(self, max_results=7):
+    def __init__(self, max_results=7, source_timeouts: dict = None, cache: SearchCache = None,
+                 use_cache: bool = True, paper_index: PaperIndex = None, bm25_index: BM25Index = None,
+                 use_local_index: bool = True, pdf_store: PDFStore = None, extractor: PDFExtractor = None,
+                 mode: str = None):
         self.max_results = max_results
-        self.max_arxiv = 5
+        self.max_arxiv = max(5, max_results - 2)
         self.max_scholar = 2  # Additional papers from Scholar
+        self.max_local = 5  # Lexical matches from papers fetched earlier, used to fill gaps
+        # Per-source deadlines in seconds, measured from when the source starts running.
+        # A source still waiting for a pool worker after this long also counts as timed out.
+        self.source_timeouts = {'arxiv': 20.0, 'scholar': 10.0, 'local': 1.0}
+        if source_timeouts:
+            self.source_timeouts.update(source_timeouts)
+        self.last_search_status = {'timed_out': [], 'failed': [], 'timings': {}, 'cached': False}
+        self.cache = (cache or SearchCache()) if use_cache else None
+        self.use_local_index = use_local_index
+        self._paper_index = paper_index
+        self._bm25_index = bm25_index
+        # "network" (default) or "local_first", which answers from the index when
+        # enough papers clear this similarity; IMARA_SEARCH_MODE sets it for every caller
+        self.mode = mode or os.environ.get("IMARA_SEARCH_MODE", "network")
+        self.local_min_score = 0.6
+        self.local_min_hits = 5
         self.download_dir = Path("data/papers")
-        self.download_dir.mkdir(parents=True, exist_ok=True)
+        # Long-lived callers pass shared instances so every search sees one PDF index
+        self.pdf_store = pdf_store or PDFStore(root=str(self.download_dir))
+        self.extractor = extractor or PDFExtractor(store=self.pdf_store)
     
-    def search_papers(self, query: str, recent_only: bool = False) -> list:
-        """Search ArXiv and Google Scholar for papers"""
-        papers = []
+    def _sources(self) -> list:
+        """Enabled sources in result order as (name, search_fn, max_results)
         
-        # Search ArXiv (primary source)
-        try:
-            arxiv_papers = self._search_arxiv(query, self.max_arxiv)
-            papers.extend(arxiv_papers)
-        except Exception as e:
-            print(f"ArXiv search error: {e}")
+        Each search_fn returns an iterable of papers; generators let streaming
+        callers see papers as soon as the source produces them.
+        """
+        sources = [('arxiv', self._iter_arxiv, self.max_arxiv)]
         
-        # Search Google Scholar (supplementary) - Only if installed
+        # Google Scholar is supplementary - Only if installed
         if SCHOLARLY_AVAILABLE:
+            sources.append(('scholar', self._iter_google_scholar, self.max_scholar))
+        
+        # Local BM25 index fills in when ArXiv is short or late (see _merge)
+        if self.use_local_index:
+            sources.append(('local', self._search_bm25, self.max_local))
+        
+        return sources
+    
+    @property
+    def paper_index(self) -> PaperIndex:
+        if self._paper_index is None:
+            self._paper_index = get_paper_index()
+        return self._paper_index
+    
+    @property
+    def bm25_index(self) -> BM25Index:
+        if self._bm25_index is None:
+            self._bm25_index = get_bm25_index()
+        return self._bm25_index
+    
+    @staticmethod
+    def _plain_query(query: str) -> str:
+        """Strip ArXiv query syntax and QueryEnhancer recency terms for local matching"""
+        query = re.sub(r'\bAND\s*\(.*?\)', ' ', query)
+        query = re.sub(r'\b\w+:', ' ', query)
+        # Years and "recent"/"latest" would match any paper that mentions them
+        query = re.sub(r'\b(?:(?:19|20)\d{2}|recent|latest)\b', ' ', query, flags=re.IGNORECASE)
+        return re.sub(r'\s+', ' ', query).strip()
+    
+    def search_papers(self, query: str, recent_only: bool = False, mode: str = None) -> list:
+        """Search all sources concurrently and keep whatever arrives before each deadline.
+        
+        Sources that miss their deadline are listed in `last_search_status['timed_out']`.
+        Complete results are cached by normalized query, so repeats skip the network.
+        With mode="local_first" the local paper index answers when it has enough close
+        matches, and the network is only used when local recall is insufficient.
+        `mode` defaults to the tool's mode.
+        """
+        papers = self._cached(query)
+        if papers is not None:
+            self.last_search_status = {'timed_out': [], 'failed': [], 'timings': {}, 'cached': True}
+            return self._finalize(papers, recent_only)
+        
+        papers = self._local_first(query, mode)
+        if papers is not None:
+            return self._finalize(papers, recent_only)
+        
+        results = {}
+        status = {'timed_out': [], 'failed': [], 'timings': {}, 'cached': False}
+        
+        start = time.perf_counter()
+        started = {}  # source -> when a worker picked it up
+        futures = [
+            (name, _SOURCE_POOL.submit(self._timed, search_fn, query, limit, started, name))
+            for name, search_fn, limit in self._sources()
+        ]
+        
+        # Collect in source order so ArXiv (primary) results stay first
+        for name, future in futures:
+            timeout = self.source_timeouts.get(name, 15.0)
+            deadline = start + timeout
+            while True:
+                try:
+                    source_papers, elapsed = future.result(timeout=max(deadline - time.perf_counter(), 0))
+                    status['timings'][name] = round(elapsed, 3)
+                    results[name] = source_papers
+                except FutureTimeoutError:
+                    if name in started and started[name] + timeout > deadline:
+                        # It queued for a worker; its own clock started when it ran
+                        deadline = started[name] + timeout
+                        continue
+                    future.cancel()
+                    status['timed_out'].append(name)
+                    print(f"{name} search timed out after {timeout}s")
+                except Exception as e:
+                    status['failed'].append(name)
+                    print(f"{name} search error: {e}")
+                break
+        
+        self.last_search_status = status
+        papers = self._merge(results, status)
+        
+        # Only cache complete answers; partial results would pin a slow source's gap
+        if self.cache and papers and not status['timed_out'] and not status['failed']:
+            self.cache.put(self._cache_key(query), [p.to_dict() for p in papers])
+        
+        if self.use_local_index and papers:
+            # Indexing embeds every new paper; keep it off the request path
+            _INDEX_POOL.submit(self._remember, papers)
+        
+        return self._finalize(papers, recent_only)
+    
+    def iter_papers(self, query: str, recent_only: bool = False, mode: str = None):
+        """Yield papers as soon as any source produces them.
+        
+        Same sources, deadlines, caching and de-duplication as search_papers, but
+        results arrive in arrival order instead of after the slowest source.
+        Near-duplicates of an already yielded paper are skipped rather than merged.
+        """
+        cached = self._cached(query)
+        if cached is not None:
+            self.last_search_status = {'timed_out': [], 'failed': [], 'timings': {}, 'cached': True}
+            yield from self._finalize(cached, recent_only)
+            return
+        
+        local = self._local_first(query, mode)
+        if local is not None:
+            yield from self._finalize(local, recent_only)
+            return
+        
+        status = {'timed_out': [], 'failed': [], 'timings': {}, 'cached': False}
+        events = queue.Queue()
+        seen = SeenPapers()
+        collected = []
+        local_hits = []
+        arxiv_count = 0
+        yielded = 0
+        
+        start = time.perf_counter()
+        pending = {}  # source -> deadline, moved to start + timeout once a worker picks it up
+        started = {}
+        for name, search_fn, limit in self._sources():
+            pending[name] = start + self.source_timeouts.get(name, 15.0)
+            _SOURCE_POOL.submit(self._pump, name, search_fn, query, limit, events)
+        
+        while pending:
+            deadline = min(pending.values())
             try:
-                scholar_papers = self._search_google_scholar(query, self.max_scholar)
-                papers.extend(scholar_papers)
-            except Exception as e:
-                print(f"Scholar search error: {e}")
+                kind, name, payload = events.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                # Every source whose deadline has passed is abandoned
+                now = time.perf_counter()
+                for name in [n for n, d in pending.items() if d <= now]:
+                    del pending[name]
+                    status['timed_out'].append(name)
+                    print(f"{name} search timed out after {self.source_timeouts.get(name, 15.0)}s")
+                continue
+            
+            if name not in pending:
+                continue  # late event from a source that already timed out
+            
+            if kind == 'start':
+                started[name] = payload
+                pending[name] = max(pending[name], payload + self.source_timeouts.get(name, 15.0))
+            elif kind == 'paper':
+                if name == 'local':
+                    local_hits.append(payload)  # held back until ArXiv's shortfall is known
+                    continue
+                arxiv_count += name == 'arxiv'
+                if not seen.add(payload):
+                    continue
+                collected.append(payload)
+                if yielded < self.max_results and self._is_recent(payload, recent_only):
+                    yielded += 1
+                    yield payload
+            elif kind == 'done':
+                del pending[name]
+                status['timings'][name] = round(time.perf_counter() - started.get(name, start), 3)
+            else:
+                del pending[name]
+                status['failed'].append(name)
+                print(f"{name} search error: {payload}")
+        
+        self.last_search_status = status
+        
+        if self._arxiv_short(arxiv_count, status):
+            for paper in local_hits[:max(self.max_results - len(collected), 0)]:
+                if not seen.add(paper):
+                    continue
+                collected.append(paper)
+                if yielded < self.max_results and self._is_recent(paper, recent_only):
+                    yielded += 1
+                    yield paper
+        
+        if self.cache and collected and not status['timed_out'] and not status['failed']:
+            self.cache.put(self._cache_key(query), [p.to_dict() for p in collected])
+        if self.use_local_index and collected:
+            _INDEX_POOL.submit(self._remember, collected)
+    
+    def _arxiv_short(self, arxiv_count: int, status: dict) -> bool:
+        """Whether ArXiv left a gap for local results: too few papers, timed out or failed"""
+        return (arxiv_count < self.max_arxiv or 'arxiv' in status['timed_out']
+                or 'arxiv' in status['failed'])
+    
+    def _merge(self, results: dict, status: dict) -> list:
+        """Network results in source order, topped up with local hits only where ArXiv fell short"""
+        # The same paper often comes back from several sources under slightly different titles
+        papers = dedupe_papers([p for name, found in results.items() if name != 'local' for p in found])
+        if self._arxiv_short(len(results.get('arxiv', [])), status):
+            shortfall = max(self.max_results - len(papers), 0)
+            papers = dedupe_papers(papers + results.get('local', [])[:shortfall])
+        return papers
+    
+    @staticmethod
+    def _pump(name: str, search_fn, query: str, max_results: int, events: queue.Queue):
+        """Run one source, forwarding each paper to the events queue"""
+        events.put(('start', name, time.perf_counter()))
+        try:
+            for paper in search_fn(query, max_results):
+                events.put(('paper', name, paper))
+            events.put(('done', name, None))
+        except Exception as e:
+            events.put(('error', name, e))
+    
+    def _local_first(self, query: str, mode: str = None):
+        """Local index answer in local_first mode (recorded in last_search_status), else None"""
+        if (mode or self.mode) != "local_first" or not self.use_local_index:
+            return None
+        papers = self._search_local_index(query)
+        if papers is not None:
+            self.last_search_status = {'timed_out': [], 'failed': [], 'timings': {},
+                                       'cached': False, 'local': True}
+        return papers
+    
+    def _search_local_index(self, query: str):
+        """Papers from the local indexes, or None when too few clear the similarity bar"""
+        try:
+            hits = self.paper_index.search(self._plain_query(query), k=self.max_results,
+                                           min_score=self.local_min_score)
+        except Exception as e:
+            print(f"Local index search error: {e}")
+            hits = []
+        
+        papers = [paper for _, paper in hits]
         
+        # Exact-term matches (model names, acronyms) count toward local recall too
+        try:
+            papers.extend(paper for _, paper in self.bm25_index.search(
+                self._plain_query(query), k=self.max_results, require_all=True))
+        except Exception as e:
+            print(f"BM25 index search error: {e}")
+        papers = dedupe_papers(papers)
+        
+        if len(papers) < min(self.local_min_hits, self.max_results):
+            return None
+        return papers
+    
+    def _search_bm25(self, query: str, max_results: int) -> list:
+        """Papers from the local BM25 index that contain every query term"""
+        query = self._plain_query(query)
+        if not query:
+            return []
+        return [paper for _, paper in self.bm25_index.search(query, k=max_results, require_all=True)]
+    
+    def _remember(self, papers: list):
+        """Add fetched papers to the local indexes"""
+        try:
+            self.bm25_index.add(papers)
+        except Exception as e:
+            print(f"BM25 index update error: {e}")
+        try:
+            self.paper_index.add(papers)
+        except Exception as e:
+            print(f"Local index update error: {e}")
+    
+    def _cache_key(self, query: str) -> str:
+        """Cache key for a query at this tool's result limits
+        
+        Plans share one cache but ask for different numbers of papers; a
+        5-paper answer must not be served to a 10-paper search.
+        """
+        return f"{query} [max_results={self.max_results} max_arxiv={self.max_arxiv}]"
+    
+    def _cached(self, query: str):
+        """Cached papers for a query as Paper records, or None"""
+        cached = self.cache.get(self._cache_key(query)) if self.cache else None
+        if cached is None:
+            return None
+        return [Paper.from_dict(p) for p in cached]
+    
+    def _finalize(self, papers: list, recent_only: bool) -> list:
+        """Apply the recency filter and result limit"""
         # Filter recent papers if requested
         if recent_only and papers:
-            current_year = datetime.now().year
-            papers = [p for p in papers if int(p['published'][:4]) >= current_year - 3]
+            papers = [p for p in papers if self._is_recent(p, recent_only)]
         
         return papers[:self.max_results]
     
+    @staticmethod
+    def _is_recent(paper: Paper, recent_only: bool) -> bool:
+        """Whether a paper passes the optional last-three-years filter"""
+        return not recent_only or paper_year(paper) >= datetime.now().year - 3
+    
+    @staticmethod
+    def _timed(search_fn, query: str, max_results: int, started: dict = None, name: str = None) -> tuple:
+        """Run one source search and report its wall time (noting its start in `started`)"""
+        start = time.perf_counter()
+        if started is not None:
+            started[name] = start
+        papers = list(search_fn(query, max_results))
+        return papers, time.perf_counter() - start
+    
     def _search_arxiv(self, query: str, max_results: int) -> list:
         """Search ArXiv specifically"""
+        return list(self._iter_arxiv(query, max_results))
+    
+    def _iter_arxiv(self, query: str, max_results: int):
+        """Yield ArXiv papers as results arrive"""
         search = arxiv.Search(
             query=query,
             max_results=max_results,
             sort_by=arxiv.SortCriterion.Relevance
         )
         
-        papers = []
         for result in search.results():
-            papers.append({
-                'title': result.title,
-                'authors': [author.name for author in result.authors],
-                'summary': result.summary[:500],
-                'pdf_url': result.pdf_url,
-                'published': result.published.strftime('%Y-%m-%d'),
-                'source': 'arxiv'
-            })
-        
-        return papers
+            yield Paper(
+                title=result.title,
+                authors=tuple(author.name for author in result.authors),
+                summary=result.summary[:500],
+                pdf_url=result.pdf_url,
+                published=result.published.strftime('%Y-%m-%d'),
+                source='arxiv'
+            )
     
     def _search_google_scholar(self, query: str, max_results: int) -> list:
         """Search Google Scholar for additional papers"""
-        papers = []
-        
+        return list(self._iter_google_scholar(query, max_results))
+    
+    def _iter_google_scholar(self, query: str, max_results: int):
+        """Yield Google Scholar papers as the scholarly iterator produces them"""
         try:
             search_query = scholarly.search_pubs(query)
             
@@ -95,59 +416,50 @@ class PaperSearchTool:
                 if isinstance(year, int):
                     year = str(year)
                 
-                papers.append({
-                    'title': bib.get('title', 'Unknown'),
-                    'authors': authors,
-                    'summary': bib.get('abstract', 'No abstract available')[:500],
-                    'pdf_url': result.get('pub_url', ''),
-                    'published': f"{year}-01-01",
-                    'source': 'scholar'
-                })
+                yield Paper(
+                    title=bib.get('title', 'Unknown'),
+                    authors=tuple(authors),
+                    summary=bib.get('abstract', 'No abstract available')[:500],
+                    pdf_url=result.get('pub_url', ''),
+                    published=f"{year}-01-01",
+                    source='scholar'
+                )
         except Exception as e:
             print(f"Scholar detailed error: {e}")
+    
+    def download_and_extract(self, pdf_url: str, filename: str = None) -> str:
+        """Download PDF and extract text
         
-        return papers
+        `filename` is kept for compatibility; files are stored by arXiv ID or content hash.
+        """
+        result = self.extractor.extract_one(pdf_url)
+        if 'error' in result:
+            return result['error']
+        return result['text'][:3000]  # Return first 3000 chars
     
-    def download_and_extract(self, pdf_url: str, filename: str) -> str:
-        """Download PDF and extract text"""
-        try:
-            response = requests.get(pdf_url, timeout=30)
-            pdf_file = BytesIO(response.content)
-            
-            # Save PDF
-            save_path = self.download_dir / filename
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
-            
-            # Extract text
-            reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in reader.pages[:5]:  # First 5 pages
-                text += page.extract_text()
-            
-            return text[:3000]  # Return first 3000 chars
-        except Exception as e:
-            return f"Error extracting PDF: {str(e)}"
+    def extract_many(self, pdf_urls: list) -> list:
+        """Download and extract several PDFs in parallel (see PDFExtractor.extract_many)"""
+        return self.extractor.extract_many(pdf_urls)
     
-    def format_paper_summary(self, papers: list) -> str:
+    def format_paper_summary(self, papers: list, summary_chars: int = 200) -> str:
         """Format papers into readable summary"""
         if not papers or (len(papers) > 0 and 'error' in papers[0]):
             return "No papers found or error occurred."
         
         summary = "## Found Research Papers:\n\n"
         for i, paper in enumerate(papers, 1):
-            source_badge = "📄 ArXiv" if paper.get('source') == 'arxiv' else "🎓 Scholar"
-            summary += f"**{i}. {paper['title']}** {source_badge}\n"
-            
-            # Handle authors properly
-            authors = paper.get('authors', ['Unknown'])
-            if isinstance(authors, list):
-                author_str = ', '.join(authors[:3])
-            else:
-                author_str = str(authors)
-            
-            summary += f"   - Authors: {author_str}\n"
-            summary += f"   - Published: {paper['published']}\n"
-            summary += f"   - Summary: {paper['summary'][:200]}...\n\n"
+            summary += self.format_paper_entry(i, paper, summary_chars) + "\n"
         
         return summary
+    
+    @staticmethod
+    def format_paper_entry(i: int, paper, summary_chars: int = 200) -> str:
+        """One numbered paper: title, source, authors, date and abstract (all of it if summary_chars is None)"""
+        paper = Paper.from_dict(paper)
+        source_badge = "📄 ArXiv" if paper.source == 'arxiv' else "🎓 Scholar"
+        author_str = ', '.join(paper.authors[:3]) if paper.authors else 'Unknown'
+        
+        return (f"**{i}. {paper.title}** {source_badge}\n"
+                f"   - Authors: {author_str}\n"
+                f"   - Published: {paper.published}\n"
+                f"   - Summary: {paper.summary[:summary_chars]}...\n")
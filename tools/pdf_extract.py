@@ -0,0 +1,171 @@
+"""
+Batch PDF text extraction
+Fans PyPDF2 parsing out over a process pool and caches extracted text per PDF hash
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List
+
+import PyPDF2
+
+from tools.pdf_store import PDFStore
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Shared extraction pool; its size bounds concurrent parses per process"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Callers are threads of a multi-threaded server; forking one would copy held locks
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+
+def _retire_process_pool(pool: ProcessPoolExecutor):
+    """Drop a broken or stuck pool so the next caller builds a fresh one
+
+    Its worker processes are terminated: a hung parse would otherwise hold its
+    slot forever. Parses still running in it fail with BrokenProcessPool.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not pool:
+            return  # another thread already replaced it
+        _process_pool = None
+    for process in list((getattr(pool, '_processes', None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_pdf_text(path: str) -> tuple:
+    """Extract all page text from a PDF (runs in a worker process)"""
+    start = time.perf_counter()
+    reader = PyPDF2.PdfReader(path)
+    text = "".join((page.extract_text() or "") for page in reader.pages)
+    return text, time.perf_counter() - start
+
+
+class PDFExtractor:
+    """Download and extract many PDFs, parsing each distinct file only once"""
+
+    def __init__(self, store: PDFStore = None, cache_dir: str = "data/extracted",
+                 max_workers: int = None, download_workers: int = 4, extract_timeout: float = 60.0):
+        self.store = store or PDFStore()
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.download_workers = download_workers
+        # Seconds to wait for one document's parse before reporting it as failed
+        self.extract_timeout = extract_timeout
+
+    def _cache_path(self, sha256: str) -> Path:
+        return self.cache_dir / f"{sha256}.txt"
+
+    def _read_cache(self, sha256: str):
+        path = self._cache_path(sha256)
+        if path.exists():
+            return path.read_text(encoding='utf-8')
+        return None
+
+    def _write_cache(self, sha256: str, text: str):
+        tmp = self.cache_dir / f".{uuid.uuid4().hex}.tmp"
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, self._cache_path(sha256))
+
+    def _download(self, url: str) -> Dict:
+        start = time.perf_counter()
+        try:
+            path = self.store.fetch(url)
+            entry = self.store.lookup(url)
+            return {'path': str(path), 'sha256': entry['sha256'],
+                    'download_seconds': round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            return {'error': f"Error downloading PDF: {e}",
+                    'download_seconds': round(time.perf_counter() - start, 3)}
+
+    def extract_many(self, urls: List[str]) -> List[Dict]:
+        """Extract text for each URL, in order.
+
+        Each result has `url`, `text`, `cached`, `download_seconds`, `extract_seconds`
+        and, on failure, `error` (with empty `text`).
+        """
+        if not urls:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+            downloads = list(pool.map(self._download, urls))
+
+        results = []
+        pending = {}  # sha256 -> (pool, future, submitted_at), so duplicates within a batch parse once
+        for url, download in zip(urls, downloads):
+            result = {'url': url, 'text': '', 'cached': False,
+                      'download_seconds': download['download_seconds'], 'extract_seconds': 0.0}
+            results.append(result)
+
+            if 'error' in download:
+                result['error'] = download['error']
+                continue
+
+            sha256 = download['sha256']
+            result['sha256'] = sha256
+            cached = self._read_cache(sha256)
+            if cached is not None:
+                result['text'] = cached
+                result['cached'] = True
+            elif sha256 not in pending:
+                pending[sha256] = self._submit(download['path'])
+
+        extracted = {}
+        for sha256, (pool, future, submitted) in pending.items():
+            try:
+                text, seconds = future.result(timeout=self.extract_timeout)
+                self._write_cache(sha256, text)
+                extracted[sha256] = (text, round(seconds, 3), None)
+            except FutureTimeoutError:
+                print(f"PDF extraction timed out after {self.extract_timeout}s, restarting worker pool")
+                _retire_process_pool(pool)
+                extracted[sha256] = ('', round(time.perf_counter() - submitted, 3),
+                                     f"Error extracting PDF: timed out after {self.extract_timeout}s")
+            except BrokenProcessPool as e:
+                _retire_process_pool(pool)
+                extracted[sha256] = ('', round(time.perf_counter() - submitted, 3),
+                                     f"Error extracting PDF: worker process died ({e})")
+            except Exception as e:
+                extracted[sha256] = ('', 0.0, f"Error extracting PDF: {e}")
+
+        for result in results:
+            if result['cached'] or result.get('sha256') not in extracted:
+                continue
+            text, seconds, error = extracted[result['sha256']]
+            result['text'] = text
+            result['extract_seconds'] = seconds
+            if error:
+                result['error'] = error
+
+        return results
+
+    def _submit(self, path: str) -> tuple:
+        """Queue one parse as (pool, future, submitted_at), replacing the pool once if it broke"""
+        for attempt in range(2):
+            pool = _get_process_pool(self.max_workers)
+            try:
+                return pool, pool.submit(extract_pdf_text, path), time.perf_counter()
+            except BrokenProcessPool:
+                _retire_process_pool(pool)
+                if attempt:
+                    raise
+
+    def extract_one(self, url: str) -> Dict:
+        """Single-document form of extract_many"""
+        return self.extract_many([url])[0]
@@ -0,0 +1,136 @@
+"""
+Content-addressed PDF store
+Streams downloads to disk through a shared pooled HTTP session and reuses stored files
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_ARXIV_ID = re.compile(r'arxiv\.org/(?:pdf|abs)/(.+?)(?:\.pdf)?/?$')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide pooled session so downloads reuse TCP/TLS connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=2)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["User-Agent"] = "IMARA/2.0 (research assistant)"
+    return _session
+
+
+def arxiv_id_from_url(url: str) -> Optional[str]:
+    """Extract a filesystem-safe arXiv ID (e.g. 2401.12345v2) from a PDF/abs URL"""
+    match = _ARXIV_ID.search(url or '')
+    if not match:
+        return None
+    # Old-style IDs contain a slash (hep-th/9901001)
+    return match.group(1).replace('/', '_')
+
+
+class PDFStore:
+    """Download PDFs once, stored by arXiv ID or content hash"""
+
+    def __init__(self, root: str = "data/papers", chunk_size: int = 64 * 1024,
+                 session: requests.Session = None, timeout: float = 30):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.session = session or get_http_session()
+
+        # url -> {file, sha256, etag, last_modified}
+        self.index_file = self.root / "index.json"
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict:
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save_index(self):
+        tmp = self.index_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp, self.index_file)
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Stored entry for a URL if its file is still on disk"""
+        with self._lock:
+            entry = self._index.get(url)
+        if entry and (self.root / entry['file']).exists():
+            return entry
+        return None
+
+    def fetch(self, url: str, revalidate: bool = False) -> Path:
+        """Return a local path for the PDF, downloading only when needed.
+
+        Stored files are reused as-is; with `revalidate=True` a conditional GET
+        (ETag/Last-Modified) is sent and the body is only transferred if it changed.
+        """
+        entry = self.lookup(url)
+        if entry and not revalidate:
+            return self.root / entry['file']
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if entry and response.status_code == 304:
+                return self.root / entry['file']
+            response.raise_for_status()
+
+            # Stream to a temp file so memory stays at one chunk per download
+            digest = hashlib.sha256()
+            tmp = self.root / f".{uuid.uuid4().hex}.part"
+            try:
+                with open(tmp, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if chunk:
+                            digest.update(chunk)
+                            f.write(chunk)
+
+                sha256 = digest.hexdigest()
+                arxiv_id = arxiv_id_from_url(url)
+                filename = f"arxiv-{arxiv_id}.pdf" if arxiv_id else f"{sha256}.pdf"
+                os.replace(tmp, self.root / filename)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+
+            new_entry = {
+                'file': filename,
+                'sha256': sha256,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+
+        with self._lock:
+            self._index[url] = new_entry
+            self._save_index()
+
+        return self.root / filename
@@ -0,0 +1,149 @@
+"""
+Prompt token budgeting
+Counts tokens for the configured model and packs prompt sections into per-section budgets
+"""
+
+import math
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+# Ollama model tags mapped to Hugging Face tokenizers; used only if already downloaded
+HF_TOKENIZERS = {
+    'llama3.2': 'meta-llama/Llama-3.2-3B-Instruct',
+    'llama3.1': 'meta-llama/Llama-3.1-8B-Instruct',
+    'distilgpt2': 'distilgpt2',
+}
+
+
+class TokenCounter:
+    """Token counts for one model: its real tokenizer when cached locally, else an estimate"""
+
+    def __init__(self, model: str = "llama3.2:3b"):
+        self.model = model
+        self.tokenizer = None
+        name = HF_TOKENIZERS.get(model.split(':')[0])
+        if name:
+            try:
+                # Imported here: transformers is slow to load and only needed for a known model
+                from transformers import AutoTokenizer
+                # Never download at runtime; fall back to the estimate instead
+                self.tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=True)
+            except Exception:
+                self.tokenizer = None
+
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        # About 4 characters per token for English BPE vocabularies
+        return math.ceil(len(text) / 4)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of `text` within `max_tokens`, never cut mid-token or mid-word"""
+        if max_tokens <= 0 or not text:
+            return ''
+        if self.count(text) <= max_tokens:
+            return text
+        if self.tokenizer is not None:
+            ids = self.tokenizer.encode(text, add_special_tokens=False)[:max_tokens]
+            cut = self.tokenizer.decode(ids)
+        else:
+            cut = text[:max_tokens * 4]
+        # Drop a trailing partial word
+        trimmed = re.sub(r'\s+\S*$', '', cut)
+        return trimmed or cut
+
+
+@dataclass
+class Section:
+    """One part of a prompt; `items` are in descending value order"""
+
+    name: str
+    items: Sequence[str]
+    max_tokens: int
+    separator: str = "\n"
+    # Don't bother squeezing in a truncated item smaller than this
+    min_partial_tokens: int = 32
+
+
+@dataclass
+class PackedPrompt:
+    sections: Dict[str, str] = field(default_factory=dict)
+    usage: Dict[str, int] = field(default_factory=dict)
+    budgets: Dict[str, int] = field(default_factory=dict)
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.usage.values())
+
+
+class PromptBudget:
+    """Fill each section up to its budget with whole items, best first
+
+    When the next item does not fit, it is truncated into the remaining space
+    (if that space is worth using) and the rest of the section is dropped.
+    """
+
+    def __init__(self, counter: 'TokenCounter' = None):
+        self.counter = counter or get_token_counter()
+
+    def pack(self, stage: str, sections: List[Section], log: bool = True) -> PackedPrompt:
+        packed = PackedPrompt()
+        for section in sections:
+            parts, used, dropped = [], 0, 0
+            sep_tokens = self.counter.count(section.separator)
+            for i, item in enumerate(section.items):
+                cost = self.counter.count(item) + (sep_tokens if parts else 0)
+                if used + cost <= section.max_tokens:
+                    parts.append(item)
+                    used += cost
+                    continue
+                remaining = section.max_tokens - used - (sep_tokens if parts else 0)
+                if remaining >= section.min_partial_tokens:
+                    partial = self.counter.truncate(item, remaining)
+                    if partial:
+                        parts.append(partial)
+                        used += self.counter.count(partial) + (sep_tokens if len(parts) > 1 else 0)
+                dropped = len(section.items) - len(parts)
+                break
+            packed.sections[section.name] = section.separator.join(parts)
+            packed.usage[section.name] = used
+            packed.budgets[section.name] = section.max_tokens
+            packed.dropped[section.name] = dropped
+
+        if log:
+            log_usage(stage, packed.usage, packed.budgets, self.counter)
+        return packed
+
+    def fit(self, stage: str, name: str, text: str, max_tokens: int) -> str:
+        """Single-section shorthand: `text` trimmed to `max_tokens`, logged under `stage`"""
+        trimmed = self.counter.truncate(text, max_tokens)
+        log_usage(stage, {name: self.counter.count(trimmed)}, {name: max_tokens}, self.counter)
+        return trimmed
+
+
+def log_usage(stage: str, usage: Dict[str, int], budgets: Dict[str, int], counter: TokenCounter):
+    """One line per prompt: tokens used against budget for every section"""
+    parts = ' '.join(f"{name}={used}/{budgets.get(name, '-')}" for name, used in usage.items())
+    kind = 'tokens' if counter.exact else '~tokens'
+    print(f"[{kind}] {stage}: {parts} total={sum(usage.values())}")
+
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_token_counter(model: str = "llama3.2:3b") -> TokenCounter:
+    """Shared counter per model (tokenizers are slow to load)"""
+    with _counters_lock:
+        if model not in _counters:
+            _counters[model] = TokenCounter(model)
+        return _counters[model]
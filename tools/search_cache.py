@@ -0,0 +1,111 @@
+"""
+Persistent search-result cache
+Disk-backed (SQLite) cache in front of paper searches with TTL and LRU eviction
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so casing and spacing variants share one cache entry"""
+    return re.sub(r'\s+', ' ', query.strip().lower())
+
+
+class SearchCache:
+    """SQLite-backed paper search cache keyed by normalized query"""
+
+    def __init__(self, path: str = "data/search_cache.db", ttl_seconds: float = 24 * 3600,
+                 max_entries: int = 1000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # Searches fan out over worker threads, so the connection is shared under a lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                query TEXT PRIMARY KEY,
+                papers TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, query: str) -> Optional[List[Dict]]:
+        """Return cached papers for a query, or None on miss/expiry"""
+        key = normalize_query(query)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT papers, created_at FROM search_cache WHERE query = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE query = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE search_cache SET last_access = ? WHERE query = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, query: str, papers: List[Dict]):
+        """Store papers for a query and evict least-recently-used entries over capacity"""
+        key = normalize_query(query)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (query, papers, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(papers), now, now)
+            )
+            self._conn.execute("""
+                DELETE FROM search_cache WHERE query IN (
+                    SELECT query FROM search_cache
+                    ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def clear(self):
+        """Drop all cached searches"""
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'entries': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds
+        }
@@ -1,5 +1,6 @@
 import streamlit as st
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 # Add parent directory to path to import from root
@@ -8,7 +9,10 @@ sys.path.append(str(Path(__file__).parent.parent))
 from langgraph.graph import StateGraph, MessagesState, START
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_ollama import OllamaLLM
+from tools.llm_backends import create_llm
+from agents.execution_plans import get_plan
+from tools.llm_cache import CachedLLM, bypass_cache
+from tools.prompt_budget import PromptBudget, get_token_counter
 
 # Page configuration
 st.set_page_config(
@@ -79,18 +83,25 @@ class AgentState(MessagesState):
     review_feedback: str = ""
     final_report: str = ""
     quality_metrics: dict = {}
+    route: str = ""
 
 # Initialize LLM and tools
 @st.cache_resource
 def init_llm():
-    return OllamaLLM(model="llama3.2:3b", temperature=0.7)
+    return CachedLLM(create_llm())
 
 @st.cache_resource
 def init_search():
     return DuckDuckGoSearchRun()
 
+@st.cache_resource
+def init_metrics_aggregates():
+    from tools.metrics_aggregates import get_metrics_aggregates
+    return get_metrics_aggregates()
+
 llm = init_llm()
 search_tool = init_search()
+prompt_budget = PromptBudget(get_token_counter(llm.model))
 
 # Agent functions with Streamlit updates and metrics
 def researcher_agent(state: AgentState) -> dict:
@@ -110,8 +121,9 @@ def researcher_agent(state: AgentState) -> dict:
             st.session_state.routing_analysis = routing_info
             st.write(f"   → Route: **{routing_info['path']}** (Confidence: {routing_info['confidence']})")
             
-            # Perform research
-            researcher = EnhancedResearcherAgent(llm)
+            # Perform research with the plan for this route
+            plan = get_plan(routing_info['path'])
+            researcher = EnhancedResearcherAgent(llm, plan=plan)
             st.write("📚 Analyzing papers with LLM...")
             result = researcher.research(last_message)
             summary = result['full_summary']
@@ -133,7 +145,7 @@ def researcher_agent(state: AgentState) -> dict:
             st.write("⚠️ Using fallback research method...")
             try:
                 search_results = search_tool.run(f"latest research on {last_message}")
-                summary = f"Research findings: {search_results[:800]}"
+                summary = f"Research findings: {prompt_budget.fit('researcher', 'web_results', search_results, 200)}"
             except:
                 summary = f"Research summary for: {last_message}"
             
@@ -141,16 +153,18 @@ def researcher_agent(state: AgentState) -> dict:
             status.update(label="✅ Research Complete (Fallback)", state="complete")
     
     messages = state["messages"] + [AIMessage(content=summary)]
-    return {"messages": messages, "research_results": summary, "next_agent": "coder"}
+    route = st.session_state.routing_analysis.get('path', '')
+    return {"messages": messages, "research_results": summary, "route": route, "next_agent": "coder"}
 
 def coder_agent(state: AgentState) -> dict:
     with st.status("💻 Coder Agent Working...", expanded=True) as status:
         st.write("⚙️ Generating code based on research...")
         research = state.get("research_results", "")
+        plan = get_plan(state.get("route", ""))
         
         prompt = f"""Based on this research, generate Python code skeleton for a multi-agent system:
 
-Research: {research[:300]}
+Research: {prompt_budget.fit('coder', 'research', research, plan.code_context_tokens)}
 
 Generate clean, commented code (under 30 lines).
 
@@ -169,12 +183,13 @@ def reviewer_agent(state: AgentState) -> dict:
         st.write("🔍 Reviewing outputs for quality...")
         code = state.get("code_output", "")
         research = state.get("research_results", "")
+        plan = get_plan(state.get("route", ""))
         
         prompt = f"""Review this work:
 
-Research: {research[:200]}
+Research: {prompt_budget.fit('reviewer', 'research', research, 50)}
 
-Code: {code[:400]}
+Code: {prompt_budget.fit('reviewer', 'code', code, plan.review_code_tokens)}
 
 Provide 2-3 sentence review focusing on quality and completeness.
 
@@ -257,6 +272,7 @@ st.markdown('<p style="text-align: center; color: #666;">Powered by Llama 3.2 
 with st.sidebar:
     st.header("⚙️ Configuration")
     st.info("**Model:** Llama 3.2 (3B)\n**Framework:** LangGraph\n**Mode:** Local Inference")
+    use_llm_cache = st.checkbox("Replay cached LLM responses", value=True)
     
     # NEW: Research Quality Metrics
     if st.session_state.quality_metrics:
@@ -301,6 +317,11 @@ with st.sidebar:
             else:
                 st.info(f"⏳ {agent.capitalize()}")
     
+    cache_stats = llm.stats()
+    if cache_stats['hits'] or cache_stats['misses']:
+        st.caption(f"LLM cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+                   f"~{cache_stats['tokens_saved']} tokens saved")
+    
     st.markdown("---")
     
     if st.button("🔄 Clear All", use_container_width=True):
@@ -344,7 +365,8 @@ with tab1:
                 }
                 
                 app = build_graph()
-                final_state = app.invoke(initial_state)
+                with nullcontext() if use_llm_cache else bypass_cache():
+                    final_state = app.invoke(initial_state)
                 
             st.success("✅ All agents completed successfully!")
             st.balloons()
@@ -442,6 +464,46 @@ with tab4:
                     st.metric("✨ Novelty Level", f"{scores.get('novelty', 0)}/10")
     else:
         st.info("📊 Analytics will appear after running a research query")
+    
+    # Research history (rolling aggregates, constant-time to load)
+    st.markdown("---")
+    st.subheader("📈 Research History")
+    history = init_metrics_aggregates().summary(days=30, top_clusters=10)
+    
+    if history['records']:
+        overall = history['overall']['overall_score']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Runs", history['records'])
+        with col2:
+            st.metric("Mean Score", f"{overall.get('mean', 0)}/10")
+        with col3:
+            st.metric("Median Score", f"{overall.get('p50', 0)}/10")
+        with col4:
+            st.metric("P90 Score", f"{overall.get('p90', 0)}/10")
+        
+        if history['by_day']:
+            st.write("**Daily Mean Scores (last 30 days):**")
+            st.line_chart({
+                dimension.replace('_', ' ').title(): {
+                    day['day']: day[dimension].get('mean') for day in history['by_day']
+                }
+                for dimension in ('overall_score', 'recency', 'relevance', 'citation_potential', 'diversity')
+            })
+        
+        if history['clusters']:
+            st.write("**Most Researched Topics:**")
+            st.dataframe([
+                {
+                    "Topic": cluster['last_query'],
+                    "Runs": cluster['count'],
+                    "Mean Score": cluster['overall_score'].get('mean'),
+                    "P90 Score": cluster['overall_score'].get('p90')
+                }
+                for cluster in history['clusters']
+            ], use_container_width=True)
+    else:
+        st.info("📈 History will appear once research runs have been recorded")
 
 # Footer
 st.markdown("---")